@@ -57,6 +57,9 @@ class DataValidation():
                         if not item_exists:
                             raise ValidationError("Item %s is required by location %s but is misspelled or does not exist." % (item_name, location["name"]))
 
+            elif isinstance(location["requires"], (dict, bool)):  # structured requires
+                DataValidation._checkItemNamesInStructuredRequires(location["requires"], "location %s" % location["name"])
+
             else:  # item access is in dict form
                 for item in location["requires"]:
                     # if the require entry is an object with "or" or a list of items, treat it as a standalone require of its own
@@ -133,6 +136,9 @@ class DataValidation():
                         if not item_exists:
                             raise ValidationError("Item %s is required by region %s but is misspelled or does not exist." % (item_name, region_name))
 
+            elif isinstance(region["requires"], (dict, bool)):  # structured requires
+                DataValidation._checkItemNamesInStructuredRequires(region["requires"], "region %s" % region_name)
+
             else:  # item access is in dict form
                 for item in region["requires"]:
                     # if the require entry is an object with "or" or a list of items, treat it as a standalone require of its own
@@ -165,6 +171,92 @@ class DataValidation():
                         if not item_exists:
                             raise ValidationError("Item %s is required by region %s but is misspelled or does not exist." % (item_name, region_name))
 
+    @staticmethod
+    def _getStructuredRequiresLeaves(requires, owner: str) -> list[dict]:
+        """Check the shape of a structured requires and return its item, category, call and macro objects."""
+        # true/false and an empty object, which is always true, have nothing to check
+        if isinstance(requires, bool) or requires == {}:
+            return []
+
+        if isinstance(requires, dict):
+            for operator in ("and", "or"):
+                if isinstance(requires.get(operator), list):
+                    return [leaf for part in requires[operator] for leaf in DataValidation._getStructuredRequiresLeaves(part, owner)]
+
+            if "not" in requires:
+                return DataValidation._getStructuredRequiresLeaves(requires["not"], owner)
+
+            if any(isinstance(requires.get(key), str) for key in ("item", "category", "call", "macro")):
+                return [requires]
+
+        raise ValidationError("The requires of %s has an invalid part: %s. Each part should be true/false or an object with one of and, or, not, item, category, call or macro." % (owner, json.dumps(requires)))
+
+    @staticmethod
+    def _getStructuredRequiresItemNames(requires, owner: str) -> set[str]:
+        return {leaf["item"] for leaf in DataValidation._getStructuredRequiresLeaves(requires, owner) if isinstance(leaf.get("item"), str)}
+
+    @staticmethod
+    def _checkItemNamesInStructuredRequires(requires, owner: str):
+        for leaf in DataValidation._getStructuredRequiresLeaves(requires, owner):
+            if isinstance(leaf.get("item"), str):
+                if len([item for item in DataValidation.item_table if item["name"] == leaf["item"]]) == 0:
+                    raise ValidationError("Item %s is required by %s but is misspelled or does not exist." % (leaf["item"], owner))
+
+            elif isinstance(leaf.get("category"), str):
+                if len([item for item in DataValidation.item_table if leaf["category"] in item.get('category', [])]) == 0:
+                    raise ValidationError("Item category %s is required by %s but is misspelled or does not exist." % (leaf["category"], owner))
+
+    @staticmethod
+    def checkMacrosInRequires():
+        macros = DataValidation.game_table.get("macros", {})
+
+        if not isinstance(macros, dict):
+            raise ValidationError("The macros of your game.json should be an object of macro names to requires strings.")
+
+        requires_to_check = []
+
+        for macro_name, macro in macros.items():
+            if not isinstance(macro, str):
+                raise ValidationError("Macro %s in your game.json should be a requires string." % macro_name)
+
+            requires_to_check.append(("macro", macro_name, macro))
+
+            # macros aren't attached to a location or region, so check their items here
+            for item in re.findall(r'\|[^|]+\|', macro):
+                item_name = item.strip("|").split(":")[0].strip()
+
+                if item_name.startswith("@"):
+                    if len([item for item in DataValidation.item_table if item_name[1:] in item.get('category', [])]) == 0:
+                        raise ValidationError("Item category %s is required by macro %s but is misspelled or does not exist." % (item_name[1:], macro_name))
+                elif len([item for item in DataValidation.item_table if item["name"] == item_name]) == 0:
+                    raise ValidationError("Item %s is required by macro %s but is misspelled or does not exist." % (item_name, macro_name))
+
+        for location in DataValidation.location_table:
+            requires_to_check.append(("location", location["name"], location.get("requires")))
+
+        for region_name, region in DataValidation.region_table.items():
+            requires_to_check.append(("region", region_name, region.get("requires")))
+
+            for connection_requires in list(region.get("entrance_requires", {}).values()) + list(region.get("exit_requires", {}).values()):
+                requires_to_check.append(("region", region_name, connection_requires))
+
+        for object_type, object_name, requires in requires_to_check:
+            if isinstance(requires, dict):
+                for leaf in DataValidation._getStructuredRequiresLeaves(requires, "%s %s" % (object_type, object_name)):
+                    if isinstance(leaf.get("macro"), str) and leaf["macro"] not in macros:
+                        raise ValidationError("Macro %s is used by %s %s but is misspelled or is not defined in the macros of your game.json." % (leaf["macro"], object_type, object_name))
+                continue
+
+            if not isinstance(requires, str):
+                continue
+
+            # item names and function arguments can contain square brackets, they aren't macros
+            requires = re.sub(r'\{(\w+)\((.*?)\)\}|\|[^|]+\|', '', requires)
+
+            for macro_name in re.findall(r'\[([^\[\]{}|]+)\]', requires):
+                if macro_name.strip() not in macros:
+                    raise ValidationError("Macro %s is used by %s %s but is misspelled or is not defined in the macros of your game.json." % (macro_name.strip(), object_type, object_name))
+
     @staticmethod
     def checkRegionNamesInLocations():
         for location in DataValidation.location_table:
@@ -192,6 +284,11 @@ class DataValidation():
                 if "requires" not in location:
                     continue
 
+                if isinstance(location["requires"], dict):
+                    if item["name"] in DataValidation._getStructuredRequiresItemNames(location["requires"], "location %s" % location["name"]):
+                        raise ValidationError("Item %s is required by location %s, but the item is not marked as progression." % (item["name"], location["name"]))
+                    continue
+
                 # convert to json so we don't have to guess the data type
                 location_requires = json.dumps(location["requires"])
 
@@ -210,6 +307,11 @@ class DataValidation():
                 if "requires" not in region:
                     continue
 
+                if isinstance(region["requires"], dict):
+                    if item["name"] in DataValidation._getStructuredRequiresItemNames(region["requires"], "region %s" % region_name):
+                        raise ValidationError("Item %s is required by region %s, but the item is not marked as progression." % (item["name"], region_name))
+                    continue
+
                 # convert to json so we don't have to guess the data type
                 region_requires = json.dumps(region["requires"])
 
@@ -223,6 +325,13 @@ class DataValidation():
 
     @staticmethod
     def _checkLocationRequiresForItemValueWithRegex(values_requested: dict[str, int], requires) -> dict[str, int]:
+        if isinstance(requires, dict):
+            # only the {ItemValue()} calls of a structured requires matter here, written back as a string
+            calls = [leaf for leaf in DataValidation._getStructuredRequiresLeaves(requires, "a location or region") if leaf.get("call") == "ItemValue"]
+            requires = " and ".join("{ItemValue(%s)}" % ",".join(str(arg) for arg in call.get("args", [])) for call in calls)
+        elif not isinstance(requires, str):
+            requires = json.dumps(requires)
+
         if isinstance(requires, str) and 'ItemValue' in requires:
             for result in re.findall(r'\{ItemValue\(([^:]*)\:(.*?)\)\}', requires):
                 value = result[0].lower().strip()
@@ -255,20 +364,20 @@ class DataValidation():
             manualregion = DataValidation.region_table.get(region.name, {})
             if manualregion:
                 if manualregion.get("requires"):
-                    DataValidation._checkLocationRequiresForItemValueWithRegex(values_requested, json.dumps(manualregion["requires"]))
+                    DataValidation._checkLocationRequiresForItemValueWithRegex(values_requested, manualregion["requires"])
 
                 for region_entrance, require in manualregion.get('entrance_requires', {}).items():
                     if region_entrance in used_regions_names:
-                        DataValidation._checkLocationRequiresForItemValueWithRegex(values_requested, json.dumps(require))
+                        DataValidation._checkLocationRequiresForItemValueWithRegex(values_requested, require)
 
                 for region_exit, require in manualregion.get('exit_requires', {}).items():
                     if region_exit in used_regions_names:
-                        DataValidation._checkLocationRequiresForItemValueWithRegex(values_requested, json.dumps(require))
+                        DataValidation._checkLocationRequiresForItemValueWithRegex(values_requested, require)
 
             for location in region.locations:
                 manualLocation = world.location_name_to_location.get(location.name, {})
                 if "requires" in manualLocation and manualLocation["requires"]:
-                    DataValidation._checkLocationRequiresForItemValueWithRegex(values_requested, json.dumps(manualLocation["requires"]))
+                    DataValidation._checkLocationRequiresForItemValueWithRegex(values_requested, manualLocation["requires"])
 
         # compare whats available vs requested but only if there's anything requested
         if values_requested:
@@ -460,6 +569,10 @@ def runGenerationDataValidation(cls) -> None:
     try: DataValidation.checkItemNamesInRegionRequires()
     except ValidationError as e: validation_errors.append(e)
 
+    # check that the macros used in requires are defined, and the items in them exist
+    try: DataValidation.checkMacrosInRequires()
+    except ValidationError as e: validation_errors.append(e)
+
     # check that region names are correct in locations
     try: DataValidation.checkRegionNamesInLocations()
     except ValidationError as e: validation_errors.append(e)
@@ -6,6 +6,7 @@ if 'creator' in game_table:
 game_name = "Manual_%s_%s" % (game_table["game"], game_table["player"])
 filler_item_name = game_table["filler_item_name"] if "filler_item_name" in game_table else "Filler"
 starting_items = game_table["starting_items"] if "starting_items" in game_table else None
+macros = game_table["macros"] if "macros" in game_table else {} # named requires, used as [name] in any requires
 
 if "starting_index" in game_table:
     try:
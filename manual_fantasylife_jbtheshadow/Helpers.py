@@ -6,15 +6,24 @@ import json
 
 from BaseClasses import MultiWorld, Item
 from enum import IntEnum
-from typing import Optional, List, TYPE_CHECKING, Union, get_args, get_origin, Any
+from dataclasses import make_dataclass
+from typing import Optional, List, TYPE_CHECKING, Union, get_args, get_origin, Any, Callable
 from types import GenericAlias
 from worlds.AutoWorld import World
 from .hooks.Helpers import before_is_category_enabled, before_is_item_enabled, before_is_location_enabled
+from .HookRegistry import hook_registry
 
 if TYPE_CHECKING:
+    from BaseClasses import CollectionState
     from .Items import ManualItem
     from .Locations import ManualLocation
 
+hook_registry.register(before_is_category_enabled, before_is_item_enabled, before_is_location_enabled)
+# the enabled checks leave these hooks out while they do nothing
+run_before_is_category_enabled = hook_registry.is_active(before_is_category_enabled)
+run_before_is_item_enabled = hook_registry.is_active(before_is_item_enabled)
+run_before_is_location_enabled = hook_registry.is_active(before_is_location_enabled)
+
 # blatantly copied from the minecraft ap world because why not
 def load_data_file(*args) -> dict:
     fname = "/".join(["data", *args])
@@ -41,12 +50,35 @@ def is_option_enabled(multiworld: MultiWorld, player: int, name: str) -> bool:
     return get_option_value(multiworld, player, name) > 0
 
 def get_option_value(multiworld: MultiWorld, player: int, name: str) -> Union[int, dict]:
-    option = getattr(multiworld.worlds[player].options, name, None)
+    world = multiworld.worlds[player]
+    snapshot = getattr(world, "options_snapshot", None)
+    if snapshot is not None:
+        return getattr(snapshot, name, 0)
+
+    option = getattr(world.options, name, None)
     if option is None:
         return 0
 
     return option.value
 
+_options_snapshot_classes: dict[type, type] = {}
+
+def make_options_snapshot(world: World) -> Any:
+    """A frozen, slotted copy of the value of every option of the world's player, read by get_option_value instead of world.options.\n
+    ManualWorld makes it once before_create_regions is done adjusting the options."""
+    options_class = type(world.options)
+    snapshot_class = _options_snapshot_classes.get(options_class)
+    if snapshot_class is None:
+        snapshot_class = make_dataclass(f"{options_class.__name__}Snapshot", list(world.options_dataclass.type_hints), frozen=True, slots=True)
+        _options_snapshot_classes[options_class] = snapshot_class
+
+    return snapshot_class(**{name: getattr(world.options, name).value for name in world.options_dataclass.type_hints})
+
+def refresh_options_snapshot(world: World):
+    """Replace the options snapshot of the world after one of its options was changed, if it was already made."""
+    if getattr(world, "options_snapshot", None) is not None:
+        world.options_snapshot = make_options_snapshot(world)
+
 def clamp(value, min, max):
     """Returns value clamped to the inclusive range of min and max"""
     if value < min:
@@ -59,9 +91,18 @@ def clamp(value, min, max):
 def is_category_enabled(multiworld: MultiWorld, player: int, category_name: str) -> bool:
     from .Data import category_table
     """Check if a category has been disabled by a yaml option."""
-    hook_result = before_is_category_enabled(multiworld, player, category_name)
-    if hook_result is not None:
-        return hook_result
+    world = multiworld.worlds[player]
+    enabled_categories = getattr(world, "enabled_categories", None)
+    if enabled_categories is not None:
+        if category_name in enabled_categories:
+            return True
+        if category_name in world.disabled_categories:
+            return False
+
+    if run_before_is_category_enabled:
+        hook_result = before_is_category_enabled(multiworld, player, category_name)
+        if hook_result is not None:
+            return hook_result
 
     category_data = category_table.get(category_name, {})
     return resolve_yaml_option(multiworld, player, category_data)
@@ -89,9 +130,10 @@ def is_item_name_enabled(multiworld: MultiWorld, player: int, item_name: str) ->
 
 def is_item_enabled(multiworld: MultiWorld, player: int, item: "ManualItem") -> bool:
     """Check if an item has been disabled by a yaml option."""
-    hook_result = before_is_item_enabled(multiworld, player, item)
-    if hook_result is not None:
-        return hook_result
+    if run_before_is_item_enabled:
+        hook_result = before_is_item_enabled(multiworld, player, item)
+        if hook_result is not None:
+            return hook_result
 
     return _is_manualobject_enabled(multiworld, player, item)
 
@@ -105,9 +147,10 @@ def is_location_name_enabled(multiworld: MultiWorld, player: int, location_name:
 
 def is_location_enabled(multiworld: MultiWorld, player: int, location: "ManualLocation") -> bool:
     """Check if a location has been disabled by a yaml option."""
-    hook_result = before_is_location_enabled(multiworld, player, location)
-    if hook_result is not None:
-        return hook_result
+    if run_before_is_location_enabled:
+        hook_result = before_is_location_enabled(multiworld, player, location)
+        if hook_result is not None:
+            return hook_result
 
     return _is_manualobject_enabled(multiworld, player, location)
 
@@ -115,14 +158,36 @@ def _is_manualobject_enabled(multiworld: MultiWorld, player: int, object: Any) -
     """Internal method: Check if a Manual Object has any category disabled by a yaml option.
     \nPlease use the proper is_'item/location'_enabled or is_'item/location'_name_enabled methods instead.
     """
+    enabled_categories = getattr(multiworld.worlds[player], "enabled_categories", None)
+
     enabled = True
     for category in object.get("category", []):
+        if enabled_categories is not None and category in enabled_categories:
+            continue
         if not is_category_enabled(multiworld, player, category):
             enabled = False
             break
 
     return enabled
 
+def make_enabled_categories(world: World) -> tuple[frozenset[str], frozenset[str]]:
+    """Check once which of the categories of categories.json, items.json and locations.json are enabled for the world's player.\n
+    Returns the enabled and the disabled categories, ManualWorld keeps them as enabled_categories and disabled_categories."""
+    from .Data import category_table, item_table, location_table
+
+    categories = set(category_table)
+    for object in item_table + location_table:
+        categories.update(object.get("category", []))
+
+    world.enabled_categories = world.disabled_categories = None # so is_category_enabled doesn't read the old ones
+    enabled = frozenset(category for category in categories if is_category_enabled(world.multiworld, world.player, category))
+    return enabled, frozenset(categories - enabled)
+
+def refresh_enabled_categories(world: World):
+    """Check the categories of the world again after one of its options was changed, if they were already checked."""
+    if getattr(world, "enabled_categories", None) is not None:
+        world.enabled_categories, world.disabled_categories = make_enabled_categories(world)
+
 def get_items_for_player(multiworld: MultiWorld, player: int, includePrecollected: bool = False) -> List[Item]:
     """Return list of items of a player including placed items"""
     items = [i for i in multiworld.get_items() if i.player == player]
@@ -215,6 +280,64 @@ def format_to_valid_identifier(input: str) -> str:
         input = "_" + input
     return input.replace(" ", "_")
 
+def rule_constant(func):
+    """Decorator for requires functions whose result only depends on the yaml options (and not on the CollectionState).\n
+    When requires are compiled, these functions are called once per player and their result is folded into the rule.
+    If they ask for a CollectionState, they receive None while being folded."""
+    func.manual_rule_constant = True
+    return func
+
+def is_rule_constant(func) -> bool:
+    """Was this requires function decorated with @rule_constant?"""
+    return getattr(func, "manual_rule_constant", False)
+
+def rule_factory(func):
+    """Decorator for requires functions that only need the CollectionState for their final check.\n
+    A factory doesn't ask for a CollectionState: it is called once per player with its literal arguments,
+    and returns the Callable[[CollectionState], bool] that is then used every time the requires is checked.
+    It can also return a bool or a requires string, like any other requires function."""
+    func.manual_rule_factory = True
+    return func
+
+def is_rule_factory(func) -> bool:
+    """Was this requires function decorated with @rule_factory?"""
+    return getattr(func, "manual_rule_factory", False)
+
+def item_counts_rule(player: int, item_counts: dict[str, int]) -> Callable[["CollectionState"], bool]:
+    """Make the Callable[[CollectionState], bool] checking state.has(item_name, player, count) for every item of item_counts.\n
+    Meant to be returned by @rule_factory functions, compiled requires read its item_counts and check those items directly."""
+    if len(item_counts) == 1:
+        (item_name, count), = item_counts.items()
+
+        def rule(state: "CollectionState") -> bool:
+            return state.has(item_name, player, count)
+    else:
+        counts = tuple(item_counts.items())
+
+        def rule(state: "CollectionState") -> bool:
+            for item_name, count in counts:
+                if not state.has(item_name, player, count):
+                    return False
+            return True
+
+    rule.item_counts = dict(item_counts)
+    rule.manual_rule_dependencies = frozenset(item_counts)
+    return rule
+
+def rule_dependencies(*names: str):
+    """Decorator declaring which item names (or state.prog_items keys, like the category/value counters) a requires function,
+    or a rule returned by a @rule_factory, reads from the CollectionState.\n
+    It lets the rule dependency index only re-check that rule when one of those counts changes, eg.
+    @rule_dependencies("Chapter Complete"). Without it, the rule is re-checked after every collected item."""
+    def decorator(func):
+        func.manual_rule_dependencies = frozenset(names)
+        return func
+    return decorator
+
+def get_rule_dependencies(func) -> Optional[frozenset[str]]:
+    """The names declared with @rule_dependencies (or by item_counts_rule), or None if they are unknown."""
+    return getattr(func, "manual_rule_dependencies", None)
+
 class ProgItemsCat(IntEnum):
     VALUE = 1
     CATEGORY = 2
@@ -0,0 +1,82 @@
+import dis
+from enum import IntEnum
+from typing import Callable
+
+
+class HookKind(IntEnum):
+    ACTIVE = 1
+    NOOP = 2 # only does `pass` (or returns None)
+    IDENTITY = 3 # only returns its first argument as it was given
+    MARKED = 4 # decorated with @noop_hook
+
+def noop_hook(func):
+    """Decorator for hooks that do nothing worth calling, but that can't be told apart from their code
+    (eg. they only log something in debug). Manual then skips them like the hooks that only `pass` or `return item`."""
+    func.manual_noop_hook = True
+    return func
+
+def _instructions(func: Callable) -> list[dis.Instruction]:
+    return [instruction for instruction in dis.get_instructions(func)
+            if instruction.opname not in ("RESUME", "NOP", "CACHE", "EXTENDED_ARG")]
+
+def is_noop_function(func: Callable) -> bool:
+    """Does this function only `pass` (or `return None`), like a hook that was left as it comes (eg. after_collect_item)?\n
+    Checked from its bytecode, comments and docstrings don't matter."""
+    if getattr(func, "__code__", None) is None:
+        return False
+
+    instructions = _instructions(func)
+    if len(instructions) == 1:
+        return instructions[0].opname == "RETURN_CONST" and instructions[0].argval is None
+    return len(instructions) == 2 \
+        and instructions[0].opname == "LOAD_CONST" and instructions[0].argval is None \
+        and instructions[1].opname == "RETURN_VALUE"
+
+def is_identity_function(func: Callable) -> bool:
+    """Does this function only return its first argument as it was given, like a hook that was left as it comes (eg. before_create_item)?\n
+    Checked from its bytecode, so anything more than a plain `return arg` (or a function it can't read) counts as not being one."""
+    code = getattr(func, "__code__", None)
+    if code is None or code.co_argcount < 1:
+        return False
+
+    instructions = _instructions(func)
+    return len(instructions) == 2 \
+        and instructions[0].opname.startswith("LOAD_FAST") and instructions[0].argval == code.co_varnames[0] \
+        and instructions[1].opname == "RETURN_VALUE"
+
+def get_hook_name(func: Callable) -> str:
+    """The hook's name with the hooks module it's from, eg. World.after_collect_item"""
+    return f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+def get_hook_kind(func: Callable) -> HookKind:
+    if getattr(func, "manual_noop_hook", False):
+        return HookKind.MARKED
+    if is_noop_function(func):
+        return HookKind.NOOP
+    if is_identity_function(func):
+        return HookKind.IDENTITY
+    return HookKind.ACTIVE
+
+class HookRegistry:
+    """Which hooks actually do something, checked once when they're registered at import.\n
+    The code calling a hook often (on every collect, every created item, every enabled check...) asks is_active first,
+    and leaves out the hooks that don't do anything."""
+
+    def __init__(self):
+        self.hooks: dict[str, tuple[Callable, HookKind]] = {}
+
+    def register(self, *hooks: Callable):
+        for hook in hooks:
+            self.hooks[get_hook_name(hook)] = (hook, get_hook_kind(hook))
+
+    def is_active(self, hook: Callable) -> bool:
+        """Does this hook do something, and so has to be called? Hooks that weren't registered are always called."""
+        registered, kind = self.hooks.get(get_hook_name(hook), (None, HookKind.ACTIVE))
+        return registered is not hook or kind == HookKind.ACTIVE
+
+    def summary(self) -> str:
+        active = [name for name, (_, kind) in self.hooks.items() if kind == HookKind.ACTIVE]
+        noop = [f"{name} ({kind.name.lower()})" for name, (_, kind) in self.hooks.items() if kind != HookKind.ACTIVE]
+        return f"Active hooks: {', '.join(active) or 'none'}\nHooks doing nothing: {', '.join(noop) or 'none'}"
+
+hook_registry = HookRegistry()
@@ -1,6 +1,13 @@
-from BaseClasses import Item
+from collections.abc import Iterable, MutableSequence
+from typing import TYPE_CHECKING, Optional
+
+from BaseClasses import Item, ItemClassification
 from .Data import item_table
 from .Game import filler_item_name, starting_index
+from .Helpers import format_state_prog_items_key, ProgItemsCat
+
+if TYPE_CHECKING:
+    from BaseClasses import MultiWorld
 
 
 ######################
@@ -10,6 +17,8 @@ from .Game import filler_item_name, starting_index
 item_id_to_name: dict[int, str] = {}
 item_name_to_item: dict[str, dict] = {}
 item_name_groups: dict[str, str] = {}
+item_name_to_categories: dict[str, tuple[str, ...]] = {}
+item_name_to_prog_items_deltas: dict[str, tuple[tuple[str, int], ...]] = {}
 advancement_item_names: set[str] = set()
 lastItemId = -1
 
@@ -50,6 +59,9 @@ for item in item_table:
             item_name_groups[c] = []
         item_name_groups[c].append(item_name)
 
+    # dict.fromkeys drops duplicate categories while keeping their order
+    item_name_to_categories[item_name] = tuple(dict.fromkeys(item.get("category", [])))
+
     #Just lowercase the values here to remove all the .lower.strip down the line
     item['value'] = {k.lower().strip(): v
                      for k, v in item.get('value', {}).items()}
@@ -60,6 +72,12 @@ for item in item_table:
             item_name_groups[group_name] = []
         item_name_groups[group_name].append(item_name)
 
+    # The state.prog_items changes ManualWorld.collect/remove apply for this item, on top of the item itself
+    deltas = [(format_state_prog_items_key(ProgItemsCat.VALUE, k), int(v)) for k, v in item["value"].items()]
+    deltas.extend((format_state_prog_items_key(ProgItemsCat.CATEGORY, c), 1) for c in item_name_to_categories[item_name])
+    if deltas:
+        item_name_to_prog_items_deltas[item_name] = tuple(deltas)
+
 item_id_to_name[None] = "__Victory__"
 item_name_to_id = {name: id for id, name in item_id_to_name.items()}
 
@@ -71,3 +89,197 @@ item_name_to_id = {name: id for id, name in item_id_to_name.items()}
 
 class ManualItem(Item):
     game = "Manual"
+
+
+class ItemPool(MutableSequence):
+    """The item pool create_items builds and hands to the item pool hooks.\n
+    It works like a list of items, in pool order, and also indexes the items by name and classification
+    so removing an item (or n copies of a name) doesn't have to search the whole pool.\n
+    Like list.remove, remove(item) removes the first item in the pool that == item, which for AP items is the first one with the same name and player."""
+
+    def __init__(self, items: Iterable[Item] = ()):
+        self._slots: list[Optional[Item]] = [] # the items in pool order, None where one was removed
+        self._holes = 0 # how many None there are in _slots
+        self._by_name: dict[str, dict[int, None]] = {} # name -> slots of the items with that name
+        self._by_classification: dict[ItemClassification, dict[int, None]] = {} # classification -> slots, as of when it was last checked
+        self.extend(items)
+
+    def _index(self, slot: int, item: Item):
+        self._by_name.setdefault(item.name, {})[slot] = None
+        self._by_classification.setdefault(item.classification, {})[slot] = None
+
+    def _unindex(self, slot: int, item: Item):
+        del self._by_name[item.name][slot]
+        slots = self._by_classification.get(item.classification)
+        if slots is not None and slot in slots:
+            del slots[slot]
+            return
+        # the item's classification was changed since it was indexed
+        for slots in self._by_classification.values():
+            slots.pop(slot, None)
+
+    def _reindex(self):
+        self._by_name.clear()
+        self._by_classification.clear()
+        for slot, item in enumerate(self._slots):
+            self._index(slot, item)
+
+    def _add(self, item: Item):
+        self._slots.append(item)
+        self._index(len(self._slots) - 1, item)
+
+    def _discard(self, slot: int) -> Item:
+        item = self._slots[slot]
+        self._unindex(slot, item)
+        self._slots[slot] = None
+        self._holes += 1
+        # keep the last slot an item, so pop() doesn't have to look for it
+        while self._slots and self._slots[-1] is None:
+            self._slots.pop()
+            self._holes -= 1
+        return item
+
+    def _compact(self):
+        """Drop the slots of the removed items, so list indexes are slots again."""
+        if self._holes:
+            self._slots = [item for item in self._slots if item is not None]
+            self._holes = 0
+            self._reindex()
+
+    def _find(self, item: Item) -> Optional[int]:
+        for slot in sorted(self._by_name.get(item.name, ())):
+            if self._slots[slot] == item:
+                return slot
+        return None
+
+    def _reclassify(self):
+        """Move the items whose classification was changed (eg. by a hook) since they were indexed."""
+        for classification, slots in list(self._by_classification.items()):
+            moved = [slot for slot in slots if self._slots[slot].classification != classification]
+            for slot in moved:
+                del slots[slot]
+                self._by_classification.setdefault(self._slots[slot].classification, {})[slot] = None
+
+    # list protocol
+
+    def __len__(self) -> int:
+        return len(self._slots) - self._holes
+
+    def __iter__(self):
+        # iterate over a copy so hooks can still remove items from the pool while looping over it, like they could from a list
+        return iter(self.copy())
+
+    def __contains__(self, item) -> bool:
+        return isinstance(item, Item) and self._find(item) is not None
+
+    def __getitem__(self, index):
+        self._compact()
+        return self._slots[index]
+
+    def __setitem__(self, index, value):
+        self._compact()
+        if isinstance(index, slice):
+            self._slots[index] = value
+            self._reindex()
+            return
+        slot = range(len(self._slots))[index]
+        self._unindex(slot, self._slots[slot])
+        self._slots[slot] = value
+        self._index(slot, value)
+
+    def __delitem__(self, index):
+        self._compact()
+        if isinstance(index, slice):
+            del self._slots[index]
+            self._reindex()
+            return
+        self._discard(range(len(self._slots))[index])
+
+    def __add__(self, other: Iterable[Item]) -> list[Item]:
+        return self.copy() + list(other)
+
+    def __radd__(self, other: Iterable[Item]) -> list[Item]:
+        return list(other) + self.copy()
+
+    def __iadd__(self, other: Iterable[Item]) -> "ItemPool":
+        self.extend(other)
+        return self
+
+    def __repr__(self) -> str:
+        return f"ItemPool({self.copy()!r})"
+
+    def insert(self, index: int, item: Item):
+        if index >= len(self):
+            self._add(item)
+            return
+        self._compact()
+        self._slots.insert(index, item)
+        self._reindex()
+
+    def append(self, item: Item):
+        self._add(item)
+
+    def extend(self, items: Iterable[Item]):
+        for item in items:
+            self._add(item)
+
+    def remove(self, item: Item):
+        slot = self._find(item)
+        if slot is None:
+            raise ValueError(f"{item} is not in the item pool")
+        self._discard(slot)
+
+    def pop(self, index: int = -1) -> Item:
+        if index == -1 and self._slots:
+            return self._discard(len(self._slots) - 1)
+        return super().pop(index)
+
+    def clear(self):
+        self._slots.clear()
+        self._holes = 0
+        self._by_name.clear()
+        self._by_classification.clear()
+
+    def count(self, item: Item) -> int:
+        return sum(1 for slot in self._by_name.get(item.name, ()) if self._slots[slot] == item)
+
+    def copy(self) -> list[Item]:
+        if self._holes:
+            return [item for item in self._slots if item is not None]
+        return list(self._slots)
+
+    def shuffle(self, random):
+        """Shuffle the pool in place, the same way random.shuffle would shuffle it as a list."""
+        self._compact()
+        random.shuffle(self._slots)
+        self._reindex()
+
+    # lookups and bulk edits by name and classification
+
+    def count_name(self, name: str) -> int:
+        return len(self._by_name.get(name, ()))
+
+    def with_name(self, name: str) -> list[Item]:
+        """The items with this name, in pool order."""
+        return [self._slots[slot] for slot in sorted(self._by_name.get(name, ()))]
+
+    def with_classification(self, classification: ItemClassification) -> list[Item]:
+        """The items with exactly this classification, in pool order.\n
+        Items whose classification was changed after they were added are moved to their new classification first."""
+        self._reclassify()
+        return [self._slots[slot] for slot in sorted(self._by_classification.get(classification, ()))]
+
+    def remove_n(self, name: str, n: int = 1) -> list[Item]:
+        """Remove the first n items with this name from the pool and return them.\n
+        Raises a ValueError without removing anything if there are less than n of them."""
+        slots = sorted(self._by_name.get(name, ()))[:n]
+        if len(slots) < n:
+            raise ValueError(f"Tried to remove {n} {name} from the item pool but there are only {len(slots)}")
+        return [self._discard(slot) for slot in slots]
+
+    def precollect_n(self, name: str, n: int, multiworld: "MultiWorld") -> list[Item]:
+        """Remove the first n items with this name from the pool and add them to their player's starting inventory."""
+        items = self.remove_n(name, n)
+        for item in items:
+            multiworld.push_precollected(item)
+        return items
@@ -1,11 +1,14 @@
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple, Optional
 from enum import IntEnum
+from dataclasses import dataclass
 from operator import eq, ge, le
 
 from .Regions import regionMap
+from .Locations import region_name_to_locations
+from .Game import macros
 from .hooks import Rules
 from .Helpers import clamp, is_item_enabled, is_option_enabled, get_option_value, convert_string_to_type,\
-    format_to_valid_identifier, format_state_prog_items_key, ProgItemsCat
+    format_to_valid_identifier, format_state_prog_items_key, ProgItemsCat, rule_constant, is_rule_factory, rule_dependencies
 
 from BaseClasses import MultiWorld, CollectionState
 from worlds.AutoWorld import World
@@ -16,6 +19,7 @@ import re
 import math
 import inspect
 import logging
+from time import perf_counter
 
 if TYPE_CHECKING:
     from . import ManualWorld
@@ -25,14 +29,28 @@ class LogicErrorSource(IntEnum):
     EVALUATE_POSTFIX = 2 # includes missing pipes and missing value on either side of AND/OR
     EVALUATE_STACK_SIZE = 3 # includes missing curly brackets
 
-def construct_logic_error(location_or_region: dict, source: LogicErrorSource) -> KeyError:
+@dataclass(frozen=True, slots=True)
+class RuleContext:
+    """What a location/region/entrance access rule checks, built once per player in set_rules.\n
+    The name and kind are only there for the error messages, evaluating a rule never changes its context."""
+    player: int
+    name: str
+    kind: str # "location", "region" or "entrance"
+    requires: Any = None
+
+def construct_logic_error(location_or_region: "dict | RuleContext", source: LogicErrorSource) -> KeyError:
     object_type = "location/region"
-    object_name = location_or_region.get("name", "Unknown")
 
-    if location_or_region.get("is_region", False) or "starting" in location_or_region or "connects_to" in location_or_region:
-        object_type = "region"
-    elif "region" in location_or_region or "category" in location_or_region:
-        object_type = "location"
+    if isinstance(location_or_region, RuleContext):
+        object_type = location_or_region.kind
+        object_name = location_or_region.name
+    else:
+        object_name = location_or_region.get("name", "Unknown")
+
+        if location_or_region.get("is_region", False) or "starting" in location_or_region or "connects_to" in location_or_region:
+            object_type = "region"
+        elif "region" in location_or_region or "category" in location_or_region:
+            object_type = "location"
 
     if source == LogicErrorSource.INFIX_TO_POSTFIX:
         source_text = "There may be mismatched parentheses, or other invalid syntax for the requires."
@@ -45,348 +63,755 @@ def construct_logic_error(location_or_region: dict, source: LogicErrorSource) ->
 
     return KeyError(f"Invalid 'requires' for {object_type} '{object_name}': {source_text} (ERROR {source})")
 
-def infix_to_postfix(expr, location):
-    prec = {"&": 2, "|": 2, "!": 3}
-    stack = []
-    postfix = ""
-
-    try:
-        for c in expr:
-            if c.isnumeric():
-                postfix += c
-            elif c in prec:
-                while stack and stack[-1] != "(" and prec[c] <= prec[stack[-1]]:
-                    postfix += stack.pop()
-                stack.append(c)
-            elif c == "(":
-                stack.append(c)
-            elif c == ")":
-                while stack and stack[-1] != "(":
-                    postfix += stack.pop()
-                stack.pop()
-
-        while stack:
-            postfix += stack.pop()
-    except Exception:
-        raise construct_logic_error(location, LogicErrorSource.INFIX_TO_POSTFIX)
-
-    return postfix
-
-
-def evaluate_postfix(expr: str, location: str) -> bool:
-    stack = []
-
-    try:
-        for c in expr:
-            if c == "0":
-                stack.append(False)
-            elif c == "1":
-                stack.append(True)
-            elif c == "&":
-                op2 = stack.pop()
-                op1 = stack.pop()
-                stack.append(op1 and op2)
-            elif c == "|":
-                op2 = stack.pop()
-                op1 = stack.pop()
-                stack.append(op1 or op2)
-            elif c == "!":
-                op = stack.pop()
-                stack.append(not op)
-    except Exception:
-        raise construct_logic_error(location, LogicErrorSource.EVALUATE_POSTFIX)
-
-    if len(stack) != 1:
-        raise construct_logic_error(location, LogicErrorSource.EVALUATE_STACK_SIZE)
-
-    return stack.pop()
-
-def set_rules(world: "ManualWorld", multiworld: MultiWorld, player: int):
-    # this is only called when the area (think, location or region) has a "requires" field that is a string
-    def checkRequireStringForArea(state: CollectionState, area: dict):
-        requires_list = area["requires"]
-
-        # Get the "real" item counts of item in the pool/placed/starting_items
-        items_counts = world.get_item_counts(player, only_progression=True)
-
-        # Preparing some variables for exception messages
-        area_type = "region" if area.get("is_region",False) else "location"
-        area_name = area.get("name", f"unknown with these parameters: {area}")
-
-        if requires_list == "":
-            return True
+class TokenType(IntEnum):
+    FUNCTION = 1
+    ITEM = 2
+    CATEGORY = 3
+    AND = 4
+    OR = 5
+    NOT = 6
+    OPEN = 7
+    CLOSE = 8
+    NUMBER = 9
+    MACRO = 10
+
+class RequiresToken(NamedTuple):
+    type: TokenType
+    text: str
+    name: str = ""
+    value: str = ""
+
+_token_patterns = [
+    (TokenType.FUNCTION, re.compile(r'\{(\w+)\((.*?)\)\}')),
+    (TokenType.ITEM, re.compile(r'\|[^|]+\|')),
+    (TokenType.AND, re.compile(r'\bAND\b', re.IGNORECASE)),
+    (TokenType.OR, re.compile(r'\bOR\b', re.IGNORECASE)),
+    (TokenType.NUMBER, re.compile(r'\d+')),
+    (TokenType.MACRO, re.compile(r'\[([^\[\]{}|]+)\]')),
+]
+_single_char_tokens = {"!": TokenType.NOT, "(": TokenType.OPEN, ")": TokenType.CLOSE}
+
+def tokenize_requires(requires: str) -> list[RequiresToken]:
+    """Split a requires string into typed tokens. A requires is made of:\n
+    - |Item Name| or |Item Name:count|, and |@Category| or |@Category:count|, where count is a number, 'all', 'half' or a percentage like '50%'
+    - {function(arguments)}, a function of this file or of hooks/Rules.py
+    - [macro], a named requires from the "macros" of game.json
+    - a number, false for 0 and true otherwise
+    - AND, OR (case insensitive, evaluated left to right with the same precedence), ! for NOT, and parentheses\n
+    Any character that isn't part of a token (extra spaces, stray brackets, etc.) is ignored."""
+    tokens: list[RequiresToken] = []
+    position = 0
+    length = len(requires)
+
+    while position < length:
+        char = requires[position]
+        if char.isspace():
+            position += 1
+            continue
 
-        def findAndRecursivelyExecuteFunctions(requires_list: str, recursionDepth: int = 0) -> str:
-            found_functions = re.findall(r'\{(\w+)\((.*?)\)\}', requires_list)
-            if found_functions:
-                if recursionDepth > world.rules_functions_maximum_recursion:
-                    raise RecursionError(f'One or more functions in {area_type} "{area_name}"\'s requires looped too many time (maximum recursion is {world.rules_functions_maximum_recursion}) \
-                                         \n    As of this Exception the following function(s) are waiting to run: {[f[0] for f in found_functions]} \
-                                         \n    And the currently processed requires look like this: "{requires_list}"')
-                else:
-                    for item in found_functions:
-                        func_name = item[0]
-                        func_args = item[1].split(",")
-                        if func_args == ['']:
-                            func_args.pop()
+        if char in _single_char_tokens:
+            tokens.append(RequiresToken(_single_char_tokens[char], char))
+            position += 1
+            continue
 
-                        func = globals().get(func_name)
+        for token_type, pattern in _token_patterns:
+            match = pattern.match(requires, position)
+            if match:
+                break
+        else:
+            position += 1
+            continue
 
-                        if func is None:
-                            func = getattr(Rules, func_name, None)
+        text = match.group(0)
+        if token_type == TokenType.FUNCTION:
+            tokens.append(RequiresToken(token_type, text, match.group(1), match.group(2)))
+        elif token_type == TokenType.MACRO:
+            tokens.append(RequiresToken(token_type, text, match.group(1).strip()))
+        elif token_type == TokenType.ITEM:
+            if '|@' in text:
+                token_type = TokenType.CATEGORY
+            item = text.lstrip('|@$').rstrip('|')
+            item_parts = item.split(":")
+            item_name = item
+            item_count = "1"
 
-                        if not callable(func):
-                            raise ValueError(f'Invalid function "{func_name}" in {area_type} "{area_name}".')
+            if len(item_parts) > 1:
+                item_name = item_parts[0].strip()
+                item_count = item_parts[1].strip()
 
-                        convert_req_function_args(state, func, func_args, area_name)
-                        try:
-                            result = func(*func_args)
-                        except Exception as ex:
-                            raise RuntimeError(f'A call to the function "{func_name}" in {area_type} "{area_name}"\'s requires raised an Exception. \
-                                                \nUnless it was called by another function, it should look something like "{{{func_name}({item[1]})}}" in {area_type}s.json. \
-                                                \nFull error message: \
-                                                \n\n{type(ex).__name__}: {ex}')
-                        if isinstance(result, bool):
-                            requires_list = requires_list.replace("{" + func_name + "(" + item[1] + ")}", "1" if result else "0")
-                        else:
-                            requires_list = requires_list.replace("{" + func_name + "(" + item[1] + ")}", str(result))
+            tokens.append(RequiresToken(token_type, text, item_name, item_count))
+        else:
+            tokens.append(RequiresToken(token_type, text))
+        position = match.end()
 
-                requires_list = findAndRecursivelyExecuteFunctions(requires_list, recursionDepth + 1)
-            return requires_list
+    return tokens
 
-        requires_list = findAndRecursivelyExecuteFunctions(requires_list)
+class LazyRequiresEvaluator:
+    """Evaluates the tokens of a requires left to right, AND and OR sharing the same precedence.\n
+    Operands are only evaluated when their value is needed: the right side of an AND is skipped once the left side is false,
+    and the right side of an OR once the left side is true."""
 
-        # parse user written statement into list of each item
-        for item in re.findall(r'\|[^|]+\|', requires_list):
-            require_type = 'item'
+    def __init__(self, tokens: list[RequiresToken], location_or_region: "dict | RuleContext", evaluate_operand: Callable[[RequiresToken], bool]):
+        self.tokens = tokens
+        self.location_or_region = location_or_region
+        self.evaluate_operand = evaluate_operand
+        self.position = 0
 
-            if '|@' in item:
-                require_type = 'category'
+    def evaluate(self) -> bool:
+        if not self.tokens:
+            return True
 
-            item_base = item
-            item = item.lstrip('|@$').rstrip('|')
+        value = self.evaluate_expression(True)
+        if self.position < len(self.tokens):
+            if self.tokens[self.position].type == TokenType.CLOSE:
+                raise construct_logic_error(self.location_or_region, LogicErrorSource.INFIX_TO_POSTFIX)
+            raise construct_logic_error(self.location_or_region, LogicErrorSource.EVALUATE_STACK_SIZE)
+        return value
+
+    def evaluate_expression(self, needed: bool) -> bool:
+        value = self.evaluate_next_operand(needed)
+        while self.position < len(self.tokens):
+            operator = self.tokens[self.position].type
+            if operator == TokenType.AND:
+                self.position += 1
+                if needed and value:
+                    value = self.evaluate_next_operand(True)
+                else:
+                    self.evaluate_next_operand(False)
+            elif operator == TokenType.OR:
+                self.position += 1
+                if needed and not value:
+                    value = self.evaluate_next_operand(True)
+                else:
+                    self.evaluate_next_operand(False)
+            else:
+                break
+        return value
+
+    def evaluate_next_operand(self, needed: bool) -> bool:
+        """Evaluate the next operand, or only skip over it if its value isn't needed."""
+        if self.position >= len(self.tokens):
+            raise construct_logic_error(self.location_or_region, LogicErrorSource.EVALUATE_POSTFIX)
+
+        token = self.tokens[self.position]
+        self.position += 1
+
+        if token.type == TokenType.NOT:
+            return not self.evaluate_next_operand(needed)
+        if token.type == TokenType.OPEN:
+            value = self.evaluate_expression(needed)
+            # an unclosed parenthesis is closed by the end of the requires
+            if self.position < len(self.tokens) and self.tokens[self.position].type == TokenType.CLOSE:
+                self.position += 1
+            return value
+        if token.type in (TokenType.FUNCTION, TokenType.MACRO, TokenType.ITEM, TokenType.CATEGORY, TokenType.NUMBER):
+            return self.evaluate_operand(token) if needed else False
+
+        raise construct_logic_error(self.location_or_region, LogicErrorSource.EVALUATE_POSTFIX)
+
+######################
+# Item list requires
+######################
+
+def compile_requires_list(requires: list, player: int) -> Callable[[CollectionState], bool]:
+    """Turn a requires given as a list of "Item" / "Item:count" entries, and of item groups (a list or {"or": [...]}), into an access rule.\n
+    It's true if every plain entry is owned, or if every item of any one group is owned.
+    The entries are split once here, items needing one copy are checked with state.has_all/has_any and it stops as soon as the result is known."""
+    def split_entries(entries: list) -> tuple[tuple[str, ...], tuple[tuple[str, int], ...]]:
+        names = []
+        counts = []
+        for entry in entries:
+            entry_parts = entry.split(":")
+            if len(entry_parts) > 1:
+                counts.append((entry_parts[0], int(entry_parts[1])))
+            else:
+                names.append(entry)
+        return tuple(names), tuple(counts)
+
+    plain = []
+    groups = []
+    for entry in requires:
+        # if the require entry is an object with "or" or a list of items, it's a group that's enough on its own
+        if isinstance(entry, dict) and "or" in entry and isinstance(entry["or"], list):
+            groups.append(split_entries(entry["or"]))
+        elif isinstance(entry, list):
+            groups.append(split_entries(entry))
+        else:
+            plain.append(entry)
+
+    all_names, all_counts = split_entries(plain)
+    # groups of a single item needing one copy are all checked at once
+    any_names = tuple(names[0] for names, counts in groups if len(names) == 1 and not counts)
+    groups = tuple(group for group in groups if not (len(group[0]) == 1 and not group[1]))
+
+    dependencies = set(all_names).union(name for name, _ in all_counts)
+    for names, counts in groups:
+        dependencies.update(names)
+        dependencies.update(name for name, _ in counts)
+
+    @rule_dependencies(*dependencies, *any_names)
+    def requires_list_rule(state: CollectionState) -> bool:
+        if state.has_all(all_names, player):
+            for name, count in all_counts:
+                if not state.has(name, player, count):
+                    break
+            else:
+                return True
 
-            item_parts = item.split(":")  # type: list[str]
-            item_name = item
-            item_count = "1"
+        if any_names and state.has_any(any_names, player):
+            return True
 
+        for names, counts in groups:
+            if state.has_all(names, player):
+                for name, count in counts:
+                    if not state.has(name, player, count):
+                        break
+                else:
+                    return True
+        return False
+
+    return requires_list_rule
+
+######################
+# Structured requires
+######################
+
+def structured_requires_parts(requires: Any, context: RuleContext) -> tuple[str, Any]:
+    """Read one part of a structured requires, eg. {"and": [{"item": "Prologue Complete"}, {"call": "has_license", "args": ["Adept Miner"]}]}.\n
+    Returns ("constant", bool) for true/false and for {} (true, like an empty requires), ("and"/"or", list of parts), ("not", part) or ("token", RequiresToken) for
+    {"item"/"category": name, "count": count}, {"call": function name, "args": list of arguments} and {"macro": name}."""
+    if isinstance(requires, bool):
+        return "constant", requires
+    if isinstance(requires, dict):
+        if not requires:
+            return "constant", True
+        for operator in ("and", "or"):
+            if isinstance(requires.get(operator), list):
+                return operator, requires[operator]
+        if "not" in requires:
+            return "not", requires["not"]
+        for leaf, token_type in (("item", TokenType.ITEM), ("category", TokenType.CATEGORY)):
+            if isinstance(requires.get(leaf), str):
+                count = str(requires.get("count", 1))
+                text = f"|{'@' if token_type == TokenType.CATEGORY else ''}{requires[leaf]}:{count}|"
+                return "token", RequiresToken(token_type, text, requires[leaf], count)
+        if isinstance(requires.get("call"), str):
+            args = requires.get("args", [])
+            args = ",".join(str(arg) for arg in args) if isinstance(args, list) else str(args)
+            return "token", RequiresToken(TokenType.FUNCTION, f"{{{requires['call']}({args})}}", requires["call"], args)
+        if isinstance(requires.get("macro"), str):
+            return "token", RequiresToken(TokenType.MACRO, f"[{requires['macro']}]", requires["macro"])
+
+    raise ValueError(f'Invalid structured requires in {context.kind} "{context.name}": {requires!r}. \
+                     \nEach part should be true/false or an object with one of "and", "or", "not", "item", "category", "call" or "macro".')
+
+class _StructuredRequiresBuilder:
+    """Rewrites the tokens of a requires string as a structured requires, keeping its left to right evaluation order."""
+
+    def __init__(self, tokens: list[RequiresToken], location_or_region: dict):
+        self.tokens = tokens
+        self.location_or_region = location_or_region
+        self.position = 0
+
+    def build(self) -> Any:
+        if not self.tokens:
+            return True
 
-            if len(item_parts) > 1:
-                item_name = item_parts[0].strip()
-                item_count = item_parts[1].strip()
+        requires = self.build_expression()
+        if self.position < len(self.tokens):
+            if self.tokens[self.position].type == TokenType.CLOSE:
+                raise construct_logic_error(self.location_or_region, LogicErrorSource.INFIX_TO_POSTFIX)
+            raise construct_logic_error(self.location_or_region, LogicErrorSource.EVALUATE_STACK_SIZE)
+        return requires
+
+    def build_expression(self) -> Any:
+        requires = self.build_operand()
+        while self.position < len(self.tokens) and self.tokens[self.position].type in (TokenType.AND, TokenType.OR):
+            operator = "and" if self.tokens[self.position].type == TokenType.AND else "or"
+            self.position += 1
+            right = self.build_operand()
+            if isinstance(requires, dict) and list(requires) == [operator]:
+                requires[operator].append(right)
+            else:
+                requires = {operator: [requires, right]}
+        return requires
+
+    def build_operand(self) -> Any:
+        if self.position >= len(self.tokens):
+            raise construct_logic_error(self.location_or_region, LogicErrorSource.EVALUATE_POSTFIX)
+
+        token = self.tokens[self.position]
+        self.position += 1
+
+        if token.type == TokenType.NOT:
+            return {"not": self.build_operand()}
+        if token.type == TokenType.OPEN:
+            requires = self.build_expression()
+            if self.position < len(self.tokens) and self.tokens[self.position].type == TokenType.CLOSE:
+                self.position += 1
+            return requires
+        if token.type in (TokenType.ITEM, TokenType.CATEGORY):
+            requires = {"item" if token.type == TokenType.ITEM else "category": token.name}
+            if token.value != "1":
+                requires["count"] = int(token.value) if token.value.isdigit() else token.value
+            return requires
+        if token.type == TokenType.FUNCTION:
+            requires = {"call": token.name}
+            if token.value:
+                requires["args"] = token.value.split(",")
+            return requires
+        if token.type == TokenType.MACRO:
+            return {"macro": token.name}
+        if token.type == TokenType.NUMBER:
+            return int(token.text) != 0
+
+        raise construct_logic_error(self.location_or_region, LogicErrorSource.EVALUATE_POSTFIX)
+
+def convert_requires_to_structured(requires: str, location_or_region: Optional[dict] = None) -> Any:
+    """Rewrite a requires string as a structured requires, that doesn't need to be parsed when generating.\n
+    eg. "|Prologue Complete| and {has_license(Adept Miner)}" becomes
+    {"and": [{"item": "Prologue Complete"}, {"call": "has_license", "args": ["Adept Miner"]}]}"""
+    return _StructuredRequiresBuilder(tokenize_requires(requires), location_or_region or {}).build()
+
+def convert_data_requires_to_structured(data: "list | dict") -> "list | dict":
+    """Copy of the locations (list) or regions (dict) data with every string requires, entrance_requires and exit_requires
+    rewritten as structured requires. Use it to ship pre-parsed data, eg. json.dump(convert_data_requires_to_structured(location_table), file)"""
+    def convert_entry(entry: Any) -> Any:
+        if not isinstance(entry, dict):
+            return entry
+        entry = dict(entry)
+        if isinstance(entry.get("requires"), str):
+            entry["requires"] = convert_requires_to_structured(entry["requires"], entry)
+        for connections in ("entrance_requires", "exit_requires"):
+            if isinstance(entry.get(connections), dict):
+                entry[connections] = {name: convert_requires_to_structured(requires, entry) if isinstance(requires, str) else requires
+                                      for name, requires in entry[connections].items()}
+        return entry
+
+    if isinstance(data, dict):
+        return {name: convert_entry(entry) for name, entry in data.items()}
+    return [convert_entry(entry) for entry in data]
+
+def find_macro(macro_name: str, context: RuleContext) -> str:
+    """Get the requires of a [macro] from the "macros" of game.json."""
+    macro = macros.get(macro_name)
+    if not isinstance(macro, str):
+        raise ValueError(f'Invalid macro "[{macro_name}]" in {context.kind} "{context.name}", it should be a requires string in the "macros" of game.json.')
+    return macro
+
+def find_rule_function(func_name: str):
+    """Find a requires function by name, either one of the default ones below or one defined in hooks/Rules.py"""
+    func = globals().get(func_name)
+
+    if func is None:
+        func = getattr(Rules, func_name, None)
+
+    return func
+
+def convert_req_function_args(world: "ManualWorld", state: CollectionState, func, args: list[str], areaName: str):
+    """Insert the world/multiworld/state/player arguments a requires function asks for, and convert its other arguments to their annotated types"""
+    multiworld = world.multiworld
+    player = world.player
+    parameters = inspect.signature(func).parameters
+    knownParameters = [World, 'ManualWorld', MultiWorld, CollectionState]
+    index = -1
+    for parameter in parameters.values():
+        target_type = parameter.annotation
+        index += 1
+        if target_type in knownParameters:
+            if target_type in [World, 'ManualWorld']:
+                args.insert(index, world)
+            elif target_type == MultiWorld:
+                args.insert(index, multiworld)
+            elif target_type == CollectionState:
+                args.insert(index, state)
+            continue
+        if parameter.name.lower() == "player":
+            args.insert(index, player)
+            continue
 
-            total = 0
-
-            if require_type == 'category':
-                category_items = [item for item in world.item_name_to_item.values() if "category" in item and item_name in item["category"]]
-                category_items_counts = sum([items_counts.get(category_item["name"], 0) for category_item in category_items])
-                if item_count.lower() == 'all':
-                    item_count = category_items_counts
-                elif item_count.lower() == 'half':
-                    item_count = int(category_items_counts / 2)
-                elif item_count.endswith('%') and len(item_count) > 1:
-                    percent = clamp(float(item_count[:-1]) / 100, 0, 1)
-                    item_count = math.ceil(category_items_counts * percent)
+        if index < len(args) and args[index] != "":
+            value = args[index].strip()
+        else:
+            if parameter.default is not inspect.Parameter.empty:
+                if index < len(args):
+                    args[index] = parameter.default
                 else:
-                    try:
-                        item_count = int(item_count)
-                    except ValueError as e:
-                        raise ValueError(f"Invalid item count `{item_name}` in {area}.") from e
-
-                for category_item in category_items:
-                    total += state.count(category_item["name"], player)
-
-                    if total >= item_count:
-                        requires_list = requires_list.replace(item_base, "1")
-            elif require_type == 'item':
-                item_current_count = items_counts.get(item_name, 0)
-                if item_count.lower() == 'all':
-                    item_count = item_current_count
-                elif item_count.lower() == 'half':
-                    item_count = int(item_current_count / 2)
-                elif item_count.endswith('%') and len(item_count) > 1:
-                    percent = clamp(float(item_count[:-1]) / 100, 0, 1)
-                    item_count = math.ceil(item_current_count * percent)
+                    args.insert(index, parameter.default)
+                continue
+            else:
+                if parameter.annotation is inspect.Parameter.empty:
+                    raise Exception(f"A call of the \"{func.__name__}\" function in \"{areaName}\"'s requirement, asks for a value for its argument \"{parameter.name}\" but it's missing.")
                 else:
-                    item_count = int(item_count)
+                    raise Exception(f"A call of the \"{func.__name__}\" function in \"{areaName}\"'s requirement, asks for a value of type {target_type} for its argument \"{parameter.name}\" but it's missing.")
 
-                total = state.count(item_name, player)
+        if target_type == str or parameter.annotation is inspect.Parameter.empty: #Don't convert since its already a string or if we don't know the type to convert to
+            args[index] = value
+            continue
 
-                if total >= item_count:
-                    requires_list = requires_list.replace(item_base, "1")
+        try:
+            value = convert_string_to_type(value, target_type)
+
+        except Exception as e:
+            raise Exception(f"A call of the \"{func.__name__}\" function in \"{areaName}\"'s requirement, asks for a value of type {target_type}\nfor its argument \"{parameter.name}\" but its value \"{value}\" cannot be converted to {target_type} \nOriginal Error:'{e}'")
+
+        args[index] = value
+
+def is_relative_count(count: str) -> bool:
+    """Is this requires count one of 'all', 'half' or 'N%'?"""
+    return count.lower() in ('all', 'half') or (count.endswith('%') and len(count) > 1)
+
+def resolve_relative_count(count: str, total: int) -> int:
+    """Convert a requires count of 'all', 'half' or 'N%' into a number of items out of the total."""
+    if count.lower() == 'all':
+        return total
+    if count.lower() == 'half':
+        return int(total / 2)
+    if count.endswith('%') and len(count) > 1:
+        percent = clamp(float(count[:-1]) / 100, 0, 1)
+        return math.ceil(total * percent)
+    return int(count)
+
+def resolve_item_threshold(world: "ManualWorld", item_name: str, item_count: str, is_category: bool = False) -> int:
+    """Resolve the 'all', 'half' or 'N%' count of an item/category requirement into a fixed number of items.\n
+    Once create_items has stored the player's item counts the result is frozen in world.resolved_item_thresholds,
+    keyed by the requirement as written in requires eg. '|@Category:50%|'."""
+    key = f"|{'@' if is_category else ''}{item_name}:{item_count}|"
+    thresholds = world.resolved_item_thresholds.setdefault(world.player, {})
+    if key in thresholds:
+        return thresholds[key]
 
-            if total <= item_count:
-                requires_list = requires_list.replace(item_base, "0")
+    items_counts = world.get_item_counts(only_progression=True)
+    if is_category:
+        total = sum([count for name, count in items_counts.items() if item_name in world.item_name_to_categories.get(name, ())])
+    else:
+        total = items_counts.get(item_name, 0)
+    threshold = resolve_relative_count(item_count, total)
 
-        requires_list = re.sub(r'\s?\bAND\b\s?', '&', requires_list, 0, re.IGNORECASE)
-        requires_list = re.sub(r'\s?\bOR\b\s?', '|', requires_list, 0, re.IGNORECASE)
+    if world.player in world.item_counts_progression:
+        thresholds[key] = threshold
+    return threshold
 
-        requires_string = infix_to_postfix("".join(requires_list), area)
-        return (evaluate_postfix(requires_string, area))
+def set_rules(world: "ManualWorld", multiworld: MultiWorld, player: int):
+    profiler = None
+    if world.rules_profile:
+        from .RulesProfiler import RulesProfiler
+        profiler = world.rules_profiler = RulesProfiler()
 
-    # this is only called when the area (think, location or region) has a "requires" field that is a dict
-    def checkRequireDictForArea(state: CollectionState, area: dict):
-        canAccess = True
+    def profiled(kind: str, name: str, rule):
+        return profiler.wrap(kind, name, rule) if profiler else rule
 
-        for item in area["requires"]:
-            # if the require entry is an object with "or" or a list of items, treat it as a standalone require of its own
-            if (isinstance(item, dict) and "or" in item and isinstance(item["or"], list)) or (isinstance(item, list)):
-                canAccessOr = True
-                or_items = item
+    # the tokens of every requires string and macro, found when the rules are registered (see prepareRequires)
+    requiresTokens: dict[str, list[RequiresToken]] = {}
 
-                if isinstance(item, dict):
-                    or_items = item["or"]
+    # this is only called when the area (think, location or region) has a "requires" field that is a string
+    def checkRequireStringForArea(state: CollectionState, area: RuleContext):
+        if area.requires == "":
+            return True
 
-                for or_item in or_items:
-                    or_item_parts = or_item.split(":")
-                    or_item_name = or_item
-                    or_item_count = 1
+        return evaluateRequiresString(state, area, area.requires)
 
-                    if len(or_item_parts) > 1:
-                        or_item_name = or_item_parts[0]
-                        or_item_count = int(or_item_parts[1])
+    def evaluateRequiresString(state: CollectionState, area: RuleContext, requires_list: str, recursionDepth: int = 0) -> bool:
+        tokens = spliceFunctions(state, area, getTokens(requires_list), recursionDepth, requires_list)
 
-                    if not state.has(or_item_name, player, or_item_count):
-                        canAccessOr = False
+        return LazyRequiresEvaluator(tokens, area, lambda token: evaluateToken(state, area, token, recursionDepth, requires_list)).evaluate()
 
-                if canAccessOr:
-                    canAccess = True
-                    break
-            else:
-                item_parts = item.split(":")
-                item_name = item
-                item_count = 1
+    def getTokens(requires_list: str) -> list[RequiresToken]:
+        tokens = requiresTokens.get(requires_list)
+        if tokens is None:
+            # a requires returned by a function isn't known before it's returned
+            return tokenize_requires(requires_list)
+        return tokens
 
-                if len(item_parts) > 1:
-                    item_name = item_parts[0]
-                    item_count = int(item_parts[1])
+    def spliceFunctions(state: CollectionState, area: RuleContext, tokens: list[RequiresToken], recursionDepth: int, requires_list: str) -> list[RequiresToken]:
+        """Call the functions of a requires first and put their result in place of the call:
+        true/false become 1/0 and a returned requires string is spliced in as it is, without parentheses around it."""
+        if not any(token.type == TokenType.FUNCTION for token in tokens):
+            return tokens
 
-                if not state.has(item_name, player, item_count):
-                    canAccess = False
+        spliced = []
+        for token in tokens:
+            if token.type != TokenType.FUNCTION:
+                spliced.append(token)
+                continue
 
-        return canAccess
+            checkRecursion(area, token, recursionDepth, requires_list)
+            result = executeFunction(state, area, token)
+            if isinstance(result, str):
+                # an empty string is true, like an empty requires
+                spliced.extend(spliceFunctions(state, area, getTokens(result), recursionDepth + 1, result) or [RequiresToken(TokenType.NUMBER, "1")])
+            else:
+                spliced.append(RequiresToken(TokenType.NUMBER, "1" if result else "0"))
+        return spliced
+
+    def checkRecursion(area: RuleContext, token: RequiresToken, recursionDepth: int, requires_list: str):
+        if recursionDepth > world.rules_functions_maximum_recursion:
+            raise RecursionError(f'One or more functions or macros in {area.kind} "{area.name}"\'s requires looped too many time (maximum recursion is {world.rules_functions_maximum_recursion}) \
+                                 \n    As of this Exception the following function/macro is waiting to run: {token.name} \
+                                 \n    And the currently processed requires look like this: "{requires_list}"')
+
+    def evaluateToken(state: CollectionState, area: RuleContext, token: RequiresToken, recursionDepth: int, requires_list: str) -> bool:
+        if token.type in (TokenType.FUNCTION, TokenType.MACRO):
+            checkRecursion(area, token, recursionDepth, requires_list)
+        if token.type == TokenType.FUNCTION:
+            # only structured requires get here, string requires have their functions spliced first
+            result = executeFunction(state, area, token)
+            if isinstance(result, str):
+                # the structure of a structured requires is explicit, so a returned requires is evaluated on its own
+                return result == "" or evaluateRequiresString(state, area, result, recursionDepth + 1)
+            return bool(result)
+        if token.type == TokenType.MACRO:
+            # like a returned requires, a macro is evaluated on its own as if it was wrapped in parentheses
+            macro = find_macro(token.name, area)
+            return macro == "" or evaluateRequiresString(state, area, macro, recursionDepth + 1)
+        if token.type == TokenType.NUMBER:
+            return int(token.text) != 0
+        return checkItemToken(state, area, token)
+
+    # this is only called when the area (think, location or region) has a "requires" field that is a structured object or true/false
+    def checkRequireStructuredForArea(state: CollectionState, area: RuleContext):
+        return evaluateStructuredRequires(state, area, area.requires)
+
+    def evaluateStructuredRequires(state: CollectionState, area: RuleContext, requires: Any) -> bool:
+        operator, value = structured_requires_parts(requires, area)
+        if operator == "constant":
+            return value
+        if operator == "and":
+            return all(evaluateStructuredRequires(state, area, part) for part in value)
+        if operator == "or":
+            return any(evaluateStructuredRequires(state, area, part) for part in value)
+        if operator == "not":
+            return not evaluateStructuredRequires(state, area, value)
+        return evaluateToken(state, area, value, 0, value.text)
+
+    def executeFunction(state: CollectionState, area: RuleContext, token: RequiresToken) -> Any:
+        func_name = token.name
+        func_args = token.value.split(",")
+        if func_args == ['']:
+            func_args.pop()
+
+        func = find_rule_function(func_name)
+
+        if not callable(func):
+            raise ValueError(f'Invalid function "{func_name}" in {area.kind} "{area.name}".')
+
+        if profiler:
+            start = perf_counter()
+        convert_req_function_args(world, state, func, func_args, area.name)
+        try:
+            result = func(*func_args)
+            if is_rule_factory(func) and callable(result):
+                result = result(state)
+        except Exception as ex:
+            raise RuntimeError(f'A call to the function "{func_name}" in {area.kind} "{area.name}"\'s requires raised an Exception. \
+                                \nUnless it was called by another function, it should look something like "{{{func_name}({token.value})}}" in {area.kind}s.json. \
+                                \nFull error message: \
+                                \n\n{type(ex).__name__}: {ex}')
+        if profiler:
+            elapsed = perf_counter() - start
+            profiler.record("function", func_name, elapsed, result)
+            profiler.get_stats(area.kind, area.name).functions_time += elapsed
+
+        return result
+
+    def checkItemToken(state: CollectionState, area: RuleContext, token: RequiresToken) -> bool:
+        item_name = token.name
+        item_count = token.value
+
+        if token.type == TokenType.CATEGORY:
+            if is_relative_count(item_count):
+                item_count = resolve_item_threshold(world, item_name, item_count, True)
+            else:
+                try:
+                    item_count = int(item_count)
+                except ValueError as e:
+                    raise ValueError(f"Invalid item count `{item_name}` in {area.kind} \"{area.name}\".") from e
+
+            return state.count(format_state_prog_items_key(ProgItemsCat.CATEGORY, item_name), player) >= item_count
+
+        if is_relative_count(item_count):
+            item_count = resolve_item_threshold(world, item_name, item_count)
+        else:
+            item_count = int(item_count)
+
+        return state.count(item_name, player) >= item_count
+
+    # the lists of items of requires, split into an access rule when the rules are registered (see prepareRequires)
+    # keyed on the list itself, which stays in the location/region table for the whole generation
+    requiresLists: dict[int, Callable[[CollectionState], bool]] = {}
+
+    # this is only called when the area (think, location or region) has a "requires" field that is a list of items
+    def checkRequireDictForArea(state: CollectionState, area: RuleContext):
+        rule = requiresLists.get(id(area.requires))
+        if rule is None:
+            return compile_requires_list(area.requires, player)(state)
+        return rule(state)
+
+    def prepareRequires(area: RuleContext):
+        """Tokenize the requires of a location/region/entrance and the macros it uses, or split its list of items,
+        so checking its access rule only reads requiresTokens and requiresLists."""
+        prepareRequiresPart(area, area.requires)
+
+    def prepareRequiresPart(area: RuleContext, requires: Any):
+        if isinstance(requires, str):
+            if requires in requiresTokens:
+                return
+            tokens = requiresTokens[requires] = tokenize_requires(requires)
+            for token in tokens:
+                if token.type == TokenType.MACRO and isinstance(macros.get(token.name), str):
+                    prepareRequiresPart(area, macros[token.name])
+        elif isinstance(requires, (dict, bool)):
+            operator, value = structured_requires_parts(requires, area)
+            if operator in ("and", "or"):
+                for part in value:
+                    prepareRequiresPart(area, part)
+            elif operator == "not":
+                prepareRequiresPart(area, value)
+            elif operator == "token" and value.type == TokenType.MACRO and isinstance(macros.get(value.name), str):
+                prepareRequiresPart(area, macros[value.name])
+        elif isinstance(requires, list) and id(requires) not in requiresLists:
+            requiresLists[id(requires)] = compile_requires_list(requires, player)
 
     # handle any type of checking needed, then ferry the check off to a dedicated method for that check
-    def fullLocationOrRegionCheck(state: CollectionState, area: dict):
+    def fullLocationOrRegionCheck(state: CollectionState, area: Optional[RuleContext]):
         # if it's not a usable object of some sort, default to true
         if not area:
             return True
 
         # don't require the "requires" key for locations and regions if they don't need to use it
-        if "requires" not in area.keys():
+        if area.requires is None:
             return True
 
-        if isinstance(area["requires"], str):
+        if isinstance(area.requires, str):
             return checkRequireStringForArea(state, area)
+        elif isinstance(area.requires, (dict, bool)):
+            return checkRequireStructuredForArea(state, area)
         else:  # item access is in dict form
             return checkRequireDictForArea(state, area)
 
-    used_location_names = []
+    if world.rules_compile_requires:
+        from .RulesCompiler import RequiresCompiler, RuleCache, RuleDependencyIndex, make_compiled_rule, make_and
+        world.scope_compiled_caches()
+        world.rule_memo = {} # the last value of each shared sub-expression for this player, see RulesCompiler.MemoNode
+        world.rule_splices = {} # the requires strings returned by functions, compiled for this player, see RulesCompiler.FunctionNode
+        compiler = RequiresCompiler(world, profiler)
+        world.rule_dependency_index = RuleDependencyIndex(player)
+        world.rule_cache = RuleCache(world.rules_cache_max_kilobytes * 1024) if world.rules_cache_max_kilobytes > 0 else None
+
+        def compileLocationOrRegion(area: RuleContext):
+            return compiler.compile(area, lambda state, area=area: checkRequireDictForArea(state, area))
+
+        # the compiled requires of every location/entrance, read by the dependency index and RulesPruning
+        world.compiled_rule_nodes = {}
+
+        def registerCompiledRule(spot, context: RuleContext, node):
+            world.rule_dependency_index.add(spot, node)
+            world.compiled_rule_nodes.setdefault(spot, (context, []))[1].append(node)
+
+    used_location_names = set()
     # Region access rules
     for region in regionMap.keys():
-        used_location_names.extend([l.name for l in multiworld.get_region(region, player).locations])
+        used_location_names.update(l.name for l in multiworld.get_region(region, player).locations)
         if region != "Menu":
-            for exitRegion in multiworld.get_region(region, player).entrances:
-                def fullRegionCheck(state: CollectionState, region=regionMap[region], region_name=exitRegion.name):
-                    region['name'] = region_name
-                    region['is_region'] = True
-
+            regionContext = RuleContext(player, region, "region", regionMap[region].get("requires"))
+            if world.rules_compile_requires:
+                regionRule = make_compiled_rule(compileLocationOrRegion(regionContext), regionContext, world.rule_cache)
+            else:
+                prepareRequires(regionContext)
+                def regionRule(state: CollectionState, region=regionContext):
                     return fullLocationOrRegionCheck(state, region)
 
-                add_rule(world.get_entrance(exitRegion.name), fullRegionCheck)
+            if world.rules_compile_requires:
+                for exitRegion in multiworld.get_region(region, player).entrances:
+                    registerCompiledRule(exitRegion, regionContext, regionRule.root)
+            regionRule = profiled("region", region, regionRule)
+            for exitRegion in multiworld.get_region(region, player).entrances:
+                add_rule(world.get_entrance(exitRegion.name), regionRule)
             entrance_rules = regionMap[region].get("entrance_requires", {})
             for e in entrance_rules:
                 entrance = world.get_entrance(f'{e}To{region}')
-                add_rule(entrance, lambda state, rule={"requires": entrance_rules[e]}: fullLocationOrRegionCheck(state, rule))
+                entranceContext = RuleContext(player, entrance.name, "entrance", entrance_rules[e])
+                if world.rules_compile_requires:
+                    entranceRule = make_compiled_rule(compileLocationOrRegion(entranceContext), entranceContext, world.rule_cache)
+                    registerCompiledRule(entrance, entranceContext, entranceRule.root)
+                else:
+                    prepareRequires(entranceContext)
+                    entranceRule = lambda state, rule=entranceContext: fullLocationOrRegionCheck(state, rule)
+                add_rule(entrance, profiled("entrance", entrance.name, entranceRule))
             exit_rules = regionMap[region].get("exit_requires", {})
             for e in exit_rules:
                 exit = world.get_entrance(f'{region}To{e}')
-                add_rule(exit, lambda state, rule={"requires": exit_rules[e]}: fullLocationOrRegionCheck(state, rule))
+                exitContext = RuleContext(player, exit.name, "entrance", exit_rules[e])
+                if world.rules_compile_requires:
+                    exitRule = make_compiled_rule(compileLocationOrRegion(exitContext), exitContext, world.rule_cache)
+                    registerCompiledRule(exit, exitContext, exitRule.root)
+                else:
+                    prepareRequires(exitContext)
+                    exitRule = lambda state, rule=exitContext: fullLocationOrRegionCheck(state, rule)
+                add_rule(exit, profiled("entrance", exit.name, exitRule))
 
-    # Location access rules
-    for location in world.location_table:
-        if location["name"] not in used_location_names:
-            continue
+    # Location access rules, a region at a time so its context is made once for all its locations
+    for region, region_locations in region_name_to_locations.items():
+        regionContext = None
 
-        locFromWorld = multiworld.get_location(location["name"], player)
+        for location in region_locations:
+            if location["name"] not in used_location_names:
+                continue
 
-        locationRegion = regionMap[location["region"]] if "region" in location else None
+            locFromWorld = multiworld.get_location(location["name"], player)
 
-        if locationRegion:
-            locationRegion['name'] = location['region']
-            locationRegion['is_region'] = True
+            if regionContext is None:
+                regionContext = RuleContext(player, region, "region", regionMap[region].get("requires"))
 
-        if "requires" in location: # Location has requires, check them alongside the region requires
-            def checkBothLocationAndRegion(state: CollectionState, location=location, region=locationRegion):
-                locationCheck = fullLocationOrRegionCheck(state, location)
-                regionCheck = True # default to true unless there's a region with requires
+            locationContext = RuleContext(player, location["name"], "location", location.get("requires"))
+            locationRegion = regionContext
 
-                if region:
-                    regionCheck = fullLocationOrRegionCheck(state, region)
+            if locationRegion and not world.location_rules_include_region_requires \
+                    and location["region"] != "Menu" and locFromWorld.parent_region.name == location["region"]:
+                # Every entrance into the region already checks its requires, and the location can only be reached through its region
+                locationRegion = None
 
-                return locationCheck and regionCheck
+            if world.rules_compile_requires:
+                locationRule = compileLocationOrRegion(locationContext)
+                if locationRegion:
+                    locationRule = make_and([locationRule, compileLocationOrRegion(locationRegion)])
 
-            set_rule(locFromWorld, checkBothLocationAndRegion)
-        elif "region" in location: # Only region access required, check the location's region's requires
-            def fullRegionCheck(state, region=locationRegion):
-                return fullLocationOrRegionCheck(state, region)
+                set_rule(locFromWorld, profiled("location", location["name"], make_compiled_rule(locationRule, locationContext, world.rule_cache)))
+                registerCompiledRule(locFromWorld, locationContext, locationRule)
+                continue
 
-            set_rule(locFromWorld, fullRegionCheck)
-        else: # No location region and no location requires? It's accessible.
-            def allRegionsAccessible(state):
-                return True
+            prepareRequires(locationContext)
+            if locationRegion:
+                prepareRequires(locationRegion)
 
-            set_rule(locFromWorld, allRegionsAccessible)
+            if "requires" in location: # Location has requires, check them alongside the region requires
+                def checkBothLocationAndRegion(state: CollectionState, location=locationContext, region=locationRegion):
+                    locationCheck = fullLocationOrRegionCheck(state, location)
+                    regionCheck = True # default to true unless there's a region with requires
 
-    # Victory requirement
-    multiworld.completion_condition[player] = lambda state: state.has("__Victory__", player)
+                    if region:
+                        regionCheck = fullLocationOrRegionCheck(state, region)
 
-    def convert_req_function_args(state: CollectionState, func, args: list[str], areaName: str):
-        parameters = inspect.signature(func).parameters
-        knownParameters = [World, 'ManualWorld', MultiWorld, CollectionState]
-        index = -1
-        for parameter in parameters.values():
-            target_type = parameter.annotation
-            index += 1
-            if target_type in knownParameters:
-                if target_type in [World, 'ManualWorld']:
-                    args.insert(index, world)
-                elif target_type == MultiWorld:
-                    args.insert(index, multiworld)
-                elif target_type == CollectionState:
-                    args.insert(index, state)
-                continue
-            if parameter.name.lower() == "player":
-                args.insert(index, player)
-                continue
+                    return locationCheck and regionCheck
 
-            if index < len(args) and args[index] != "":
-                value = args[index].strip()
-            else:
-                if parameter.default is not inspect.Parameter.empty:
-                    if index < len(args):
-                        args[index] = parameter.default
-                    else:
-                        args.insert(index, parameter.default)
-                    continue
-                else:
-                    if parameter.annotation is inspect.Parameter.empty:
-                        raise Exception(f"A call of the \"{func.__name__}\" function in \"{areaName}\"'s requirement, asks for a value for its argument \"{parameter.name}\" but it's missing.")
-                    else:
-                        raise Exception(f"A call of the \"{func.__name__}\" function in \"{areaName}\"'s requirement, asks for a value of type {target_type} for its argument \"{parameter.name}\" but it's missing.")
-
-            if target_type == str or parameter.annotation is inspect.Parameter.empty: #Don't convert since its already a string or if we don't know the type to convert to
-                args[index] = value
-                continue
+                set_rule(locFromWorld, profiled("location", location["name"], checkBothLocationAndRegion))
+            elif locationRegion: # Only region access required, check the location's region's requires
+                def fullRegionCheck(state, region=locationRegion):
+                    return fullLocationOrRegionCheck(state, region)
 
-            try:
-                value = convert_string_to_type(value, target_type)
+                set_rule(locFromWorld, profiled("location", location["name"], fullRegionCheck))
+            else: # No location region and no location requires? It's accessible.
+                def allRegionsAccessible(state):
+                    return True
 
-            except Exception as e:
-                raise Exception(f"A call of the \"{func.__name__}\" function in \"{areaName}\"'s requirement, asks for a value of type {target_type}\nfor its argument \"{parameter.name}\" but its value \"{value}\" cannot be converted to {target_type} \nOriginal Error:'{e}'")
+                set_rule(locFromWorld, profiled("location", location["name"], allRegionsAccessible))
 
-            args[index] = value
+    if world.rules_compile_requires:
+        # so RulesPruning and get_rules_to_recheck can tell which access rules were changed after set_rules
+        world.compiled_access_rules = {spot: spot.access_rule for spot in [*multiworld.get_locations(player), *multiworld.get_entrances(player)]}
 
+    # Victory requirement
+    multiworld.completion_condition[player] = lambda state: state.has("__Victory__", player)
 
 def ItemValue(state: CollectionState, player: int, valueCount: str):
     """When passed a string with this format: 'valueName:int',
@@ -431,8 +856,7 @@ def OptOne(world: "ManualWorld", item: str, items_counts: Optional[dict] = None)
     if require_type == 'category':
         if item_count.isnumeric():
             #Only loop if we can use the result to clamp
-            category_items = [item for item in world.item_name_to_item.values() if "category" in item and item_name in item["category"]]
-            category_items_counts = sum([items_counts.get(category_item["name"], 0) for category_item in category_items])
+            category_items_counts = sum([count for name, count in items_counts.items() if item_name in world.item_name_to_categories.get(name, ())])
             item_count = clamp(int(item_count), 0, category_items_counts)
         return f"|@{item_name}:{item_count}|"
     elif require_type == 'item':
@@ -475,14 +899,17 @@ def canReachLocation(state: CollectionState, player: int, location: str):
         return True
     return False
 
+@rule_constant
 def YamlEnabled(multiworld: MultiWorld, player: int, param: str) -> bool:
     """Is a yaml option enabled?"""
     return is_option_enabled(multiworld, player, param)
 
+@rule_constant
 def YamlDisabled(multiworld: MultiWorld, player: int, param: str) -> bool:
     """Is a yaml option disabled?"""
     return not is_option_enabled(multiworld, player, param)
 
+@rule_constant
 def YamlCompare(world: "ManualWorld", multiworld: MultiWorld, state: CollectionState, player: int, args: str, skipCache: bool = False) -> bool:
     """Is a yaml option's value compared using {comparator} to the requested value
     \nFormat it like {YamlCompare(OptionName==value)}
@@ -592,4 +1019,3 @@ def YamlCompare(world: "ManualWorld", multiworld: MultiWorld, state: CollectionS
         result = world.yaml_compare_rule_cache[cacheindex]
 
     return not result if reverse_result else result
-
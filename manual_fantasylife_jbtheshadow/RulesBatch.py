@@ -0,0 +1,128 @@
+from typing import TYPE_CHECKING, Optional
+
+from .RulesCompiler import RuleNode, ConstantNode, ItemNode, CategoryNode, AndNode, OrNode, NotNode, MemoNode, CompiledRule
+
+try:
+    import numpy as np
+    numpy_loaded = True
+except ModuleNotFoundError:
+    np = None
+    numpy_loaded = False
+
+if TYPE_CHECKING:
+    from BaseClasses import CollectionState, Location
+    from . import ManualWorld
+
+# (state.prog_items key, minimum count, negated)
+Atom = tuple[str, int, bool]
+
+MAXIMUM_CLAUSES = 64
+"""Requires that expand into more AND clauses than this are left to their own access rule."""
+
+def lower_to_clauses(node: RuleNode) -> Optional[list[tuple[Atom, ...]]]:
+    """Rewrite a compiled requires as an OR of AND clauses of item counts.\n
+    Returns None if it can't be done, because of a function call or too many clauses."""
+    if isinstance(node, MemoNode):
+        return lower_to_clauses(node.child)
+    if isinstance(node, ConstantNode):
+        return [()] if node.value else []
+    if isinstance(node, ItemNode):
+        return [((node.name, node.count, False),)]
+    if isinstance(node, CategoryNode):
+        return [((node.key, node.count, False),)]
+    if isinstance(node, NotNode):
+        if isinstance(node.child, ItemNode):
+            return [((node.child.name, node.child.count, True),)]
+        if isinstance(node.child, CategoryNode):
+            return [((node.child.key, node.child.count, True),)]
+        return None
+    if isinstance(node, OrNode):
+        clauses = []
+        for child in node.children:
+            child_clauses = lower_to_clauses(child)
+            if child_clauses is None:
+                return None
+            clauses.extend(child_clauses)
+            if len(clauses) > MAXIMUM_CLAUSES:
+                return None
+        return clauses
+    if isinstance(node, AndNode):
+        clauses = [()]
+        for child in node.children:
+            child_clauses = lower_to_clauses(child)
+            if child_clauses is None:
+                return None
+            clauses = [clause + child_clause for clause in clauses for child_clause in child_clauses]
+            if len(clauses) > MAXIMUM_CLAUSES:
+                return None
+        return clauses
+    return None
+
+class LocationBatchEvaluator:
+    """Every location access rule of a player, lowered into item count thresholds so they can all be checked in one NumPy pass.\n
+    Locations whose rule can't be lowered (function calls, rules changed by hooks, etc.) keep calling their own access rule."""
+
+    def __init__(self, world: "ManualWorld"):
+        self.player = world.player
+        self.locations: tuple["Location", ...] = tuple(world.multiworld.get_locations(world.player))
+        self.regions = tuple(dict.fromkeys(location.parent_region for location in self.locations))
+        region_index = {region: i for i, region in enumerate(self.regions)}
+        self.location_region = np.array([region_index[location.parent_region] for location in self.locations], dtype=np.intp)
+
+        keys: dict[str, int] = {}
+        atoms: dict[Atom, int] = {}
+        clause_atoms: list[int] = []
+        clause_starts: list[int] = []
+        location_clause_starts: list[int] = []
+        vector_rows: list[int] = []
+        true_rows: list[int] = []
+        self.fallback_locations: list[tuple[int, "Location"]] = []
+
+        for row, location in enumerate(self.locations):
+            rule = location.access_rule
+            clauses = lower_to_clauses(rule.root) if isinstance(rule, CompiledRule) else None
+            if clauses is None:
+                self.fallback_locations.append((row, location))
+                continue
+            if any(not clause for clause in clauses):
+                true_rows.append(row)
+                continue
+            if not clauses:
+                continue # never accessible, rows default to False
+
+            vector_rows.append(row)
+            location_clause_starts.append(len(clause_starts))
+            for clause in clauses:
+                clause_starts.append(len(clause_atoms))
+                for atom in clause:
+                    if atom not in atoms:
+                        keys.setdefault(atom[0], len(keys))
+                        atoms[atom] = len(atoms)
+                    clause_atoms.append(atoms[atom])
+
+        self.keys = tuple(keys)
+        self.atom_key = np.array([keys[atom[0]] for atom in atoms], dtype=np.intp)
+        self.atom_count = np.array([atom[1] for atom in atoms], dtype=np.int64)
+        self.atom_negated = np.array([atom[2] for atom in atoms], dtype=bool)
+        self.clause_atoms = np.array(clause_atoms, dtype=np.intp)
+        self.clause_starts = np.array(clause_starts, dtype=np.intp)
+        self.location_clause_starts = np.array(location_clause_starts, dtype=np.intp)
+        self.vector_rows = np.array(vector_rows, dtype=np.intp)
+        self.true_rows = np.array(true_rows, dtype=np.intp)
+
+    def evaluate(self, state: "CollectionState") -> "np.ndarray":
+        result = np.zeros(len(self.locations), dtype=bool)
+
+        if len(self.vector_rows):
+            prog_items = state.prog_items[self.player]
+            counts = np.fromiter((prog_items.get(key, 0) for key in self.keys), dtype=np.int64, count=len(self.keys))
+            atom_ok = (counts[self.atom_key] >= self.atom_count) != self.atom_negated
+            clause_ok = np.logical_and.reduceat(atom_ok[self.clause_atoms], self.clause_starts)
+            result[self.vector_rows] = np.logical_or.reduceat(clause_ok, self.location_clause_starts)
+        result[self.true_rows] = True
+
+        for row, location in self.fallback_locations:
+            result[row] = location.access_rule(state)
+
+        region_ok = np.fromiter((region.can_reach(state) for region in self.regions), dtype=bool, count=len(self.regions))
+        return result & region_ok[self.location_region]
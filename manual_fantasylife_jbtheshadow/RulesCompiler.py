@@ -0,0 +1,903 @@
+from typing import TYPE_CHECKING, Any, Callable, Optional
+from collections import OrderedDict
+
+from .Rules import LogicErrorSource, RuleContext, TokenType, RequiresToken, construct_logic_error, find_rule_function, \
+    find_macro, structured_requires_parts, compile_requires_list, convert_req_function_args, is_relative_count, resolve_item_threshold, tokenize_requires
+from .Helpers import is_rule_constant, is_rule_factory, get_rule_dependencies, format_state_prog_items_key, ProgItemsCat
+
+from time import perf_counter
+
+if TYPE_CHECKING:
+    from BaseClasses import CollectionState
+    from . import ManualWorld
+    from .RulesProfiler import RulesProfiler
+
+######################
+# Rule nodes
+######################
+
+class RuleNode:
+    """A compiled part of a requires. Evaluating it with a CollectionState and a player gives its value."""
+    __slots__ = ()
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        raise NotImplementedError()
+
+class ConstantNode(RuleNode):
+    __slots__ = ("value",)
+
+    def __init__(self, value: bool):
+        self.value = value
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        return self.value
+
+    def __repr__(self):
+        return f"ConstantNode({self.value})"
+
+TRUE = ConstantNode(True)
+FALSE = ConstantNode(False)
+
+class ItemNode(RuleNode):
+    __slots__ = ("name", "count")
+
+    def __init__(self, name: str, count: int):
+        self.name = name
+        self.count = count
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        return state.has(self.name, player, self.count)
+
+    def __repr__(self):
+        return f"ItemNode({self.name!r}, {self.count})"
+
+class CategoryNode(RuleNode):
+    """A category requirement, checked against the category counter kept up to date by ManualWorld.collect/remove."""
+    __slots__ = ("name", "key", "count")
+
+    def __init__(self, name: str, count: int):
+        self.name = name
+        self.key = format_state_prog_items_key(ProgItemsCat.CATEGORY, name)
+        self.count = count
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        return state.has(self.key, player, self.count)
+
+    def __repr__(self):
+        return f"CategoryNode({self.name!r}, {self.count})"
+
+class AndNode(RuleNode):
+    __slots__ = ("children",)
+
+    def __init__(self, children: tuple[RuleNode, ...]):
+        self.children = children
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        for child in self.children:
+            if not child.evaluate(state, player):
+                return False
+        return True
+
+    def __repr__(self):
+        return f"AndNode{self.children}"
+
+class OrNode(RuleNode):
+    __slots__ = ("children",)
+
+    def __init__(self, children: tuple[RuleNode, ...]):
+        self.children = children
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        for child in self.children:
+            if child.evaluate(state, player):
+                return True
+        return False
+
+    def __repr__(self):
+        return f"OrNode{self.children}"
+
+class NotNode(RuleNode):
+    __slots__ = ("child",)
+
+    def __init__(self, child: RuleNode):
+        self.child = child
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        return not self.child.evaluate(state, player)
+
+    def __repr__(self):
+        return f"NotNode({self.child!r})"
+
+class PredicateNode(RuleNode):
+    """Wraps a plain Callable[[CollectionState], bool] so it can be part of a compiled rule."""
+    __slots__ = ("predicate",)
+
+    def __init__(self, predicate: Callable[["CollectionState"], bool]):
+        self.predicate = predicate
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        return self.predicate(state)
+
+class CallPlan:
+    """A requires function with its arguments bound once: the world/multiworld/player it asks for and its literal arguments, already converted.\n
+    Calling the plan only needs the CollectionState, which is put in the slot(s) the function asked for it."""
+    __slots__ = ("func", "args", "state_positions", "before_state", "after_state")
+
+    def __init__(self, func: Callable, args: list, state_positions: tuple[int, ...]):
+        self.func = func
+        self.args = tuple(args)
+        self.state_positions = state_positions
+        # Most functions ask for the state only once, this lets the call skip rebuilding the argument list
+        if len(state_positions) == 1:
+            self.before_state = self.args[:state_positions[0]]
+            self.after_state = self.args[state_positions[0] + 1:]
+        else:
+            self.before_state = self.after_state = ()
+
+    def __call__(self, state: "CollectionState") -> Any:
+        if not self.state_positions:
+            return self.func(*self.args)
+        if len(self.state_positions) == 1:
+            return self.func(*self.before_state, state, *self.after_state)
+
+        args = list(self.args)
+        for position in self.state_positions:
+            args[position] = state
+        return self.func(*args)
+
+_STATE_SLOT = object()
+
+def make_call_plan(world: "ManualWorld", func: Callable, args: str, area_name: str) -> CallPlan:
+    """Bind the arguments of a {function(args)} once, the same way the requires interpreter does it on each call."""
+    func_args: list = args.split(",")
+    if func_args == ['']:
+        func_args.pop()
+
+    convert_req_function_args(world, _STATE_SLOT, func, func_args, area_name)
+    state_positions = tuple(i for i, arg in enumerate(func_args) if arg is _STATE_SLOT)
+    return CallPlan(func, func_args, state_positions)
+
+class FunctionNode(RuleNode):
+    """A {function(args)} of a requires. Its result can be a bool, a number, or a requires string that is compiled the first time it's returned.\n
+    A returned requires string takes the place of the call, as if it was written there:
+    when the call is part of an AND/OR chain it's a SpliceNode that splices the string into that chain.\n
+    The node can be shared by every player using the same compiled requires, each player binds its own CallPlan, compiler and context.
+    The compiled requires strings are kept in the player's world (ManualWorld.rule_splices), not in the shared node."""
+    __slots__ = ("func", "func_name", "args", "depth", "bindings")
+
+    def __init__(self, func: Callable, func_name: str, args: str, depth: int):
+        self.func = func
+        self.func_name = func_name
+        self.args = args
+        self.depth = depth
+        self.bindings: dict[int, tuple[CallPlan, "RequiresCompiler", RuleContext]] = {}
+
+    def is_bound(self, player: int) -> bool:
+        return player in self.bindings
+
+    def bind(self, compiler: "RequiresCompiler", context: RuleContext):
+        self.bindings[context.player] = (compiler.get_call_plan(self.func, self.func_name, self.args, context), compiler, context)
+
+    def call(self, state: "CollectionState", player: int) -> Any:
+        plan = self.bindings[player][0]
+        try:
+            return plan(state)
+        except Exception as ex:
+            raise RequiresFunctionError(self.func_name, self.args, ex) from ex
+
+    def get_spliced(self, result: str, player: int) -> tuple["ChainItem", ...]:
+        """The AND/OR chain of a requires string returned by the function, compiled the first time it's returned."""
+        _, compiler, context = self.bindings[player]
+        splices = compiler.world.rule_splices
+        spliced = splices.get((self, result))
+        if spliced is None:
+            spliced = splices[(self, result)] = compiler.compile_chain(result, context, self.depth + 1)
+        return spliced
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        result = self.call(state, player)
+        if isinstance(result, bool):
+            return result
+        if isinstance(result, str):
+            return result == "" or evaluate_chain(self.get_spliced(result, player), state, player)
+        return bool(result)
+
+    def __repr__(self):
+        return f"FunctionNode({self.func_name}({self.args}))"
+
+class FactoryNode(RuleNode):
+    """The Callable[[CollectionState], bool] returned by a @rule_factory function, one per player since it's made with the player's options."""
+    __slots__ = ("func_name", "args", "predicates")
+
+    def __init__(self, func_name: str, args: str, player: int, predicate: Callable[["CollectionState"], bool]):
+        self.func_name = func_name
+        self.args = args
+        self.predicates: dict[int, Callable[["CollectionState"], bool]] = {player: predicate}
+
+    def is_bound(self, player: int) -> bool:
+        return player in self.predicates
+
+    def bind(self, compiler: "RequiresCompiler", context: RuleContext):
+        folded = compiler.folded_functions[(self.func_name, self.args)]
+        self.predicates[context.player] = folded.predicates[context.player]
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        return self.predicates[player](state)
+
+    def __repr__(self):
+        return f"FactoryNode({self.func_name}({self.args}))"
+
+class MemoNode(RuleNode):
+    """A sub-expression shared by several requires, which remembers its last value for each player.\n
+    The value is reused while the counts of the items/categories the sub-expression reads stay the same,
+    so it's only evaluated once per state revision. Sub-expressions with undeclared dependencies are always evaluated.\n
+    The keys it reads are found when it's bound, and the values are kept in the player's world (ManualWorld.rule_memo), not in the shared node.\n
+    Only sub-expressions that call functions are wrapped (see RequiresCompiler.intern):
+    the ones made of items and categories only are a few prog_items lookups, which is as cheap as checking the memo."""
+    __slots__ = ("child", "keys", "memos")
+
+    def __init__(self, child: RuleNode):
+        self.child = child
+        self.keys: dict[int, Optional[tuple[str, ...]]] = {}
+        self.memos: dict[int, dict["MemoNode", tuple[tuple, bool]]] = {}
+
+    def is_bound(self, player: int) -> bool:
+        return player in self.keys
+
+    def bind(self, compiler: "RequiresCompiler", context: RuleContext):
+        # bound after the nodes under it, so the dependencies of their predicates are the player's
+        dependencies = node_dependencies(self.child, context.player)
+        self.keys[context.player] = tuple(sorted(dependencies)) if dependencies is not None else None
+        self.memos[context.player] = compiler.world.rule_memo
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        keys = self.keys[player]
+        if keys is None:
+            return self.child.evaluate(state, player)
+
+        prog_items = state.prog_items[player]
+        counts = tuple([prog_items[key] for key in keys])
+        memos = self.memos[player]
+        memo = memos.get(self)
+        if memo is not None and memo[0] == counts:
+            return memo[1]
+
+        result = self.child.evaluate(state, player)
+        memos[self] = (counts, result)
+        return result
+
+    def __repr__(self):
+        return f"MemoNode({self.child!r})"
+
+# An operand of an AND/OR chain: the operator joining it to what's before it (None for the first one), if it's negated, and its node
+ChainItem = tuple[Optional[TokenType], bool, RuleNode]
+
+def evaluate_chain(items: tuple[ChainItem, ...], state: "CollectionState", player: int) -> bool:
+    """Evaluate an AND/OR chain left to right, AND and OR sharing the same precedence.\n
+    A requires string returned by a {function()} of the chain is spliced into it, in place of the call."""
+    value = None
+    for operator, negated, node in items:
+        value = _fold_operand(value, operator, negated, node, state, player)
+    return value
+
+def _fold_operand(value: Optional[bool], operator: Optional[TokenType], negated: bool, node: RuleNode, state: "CollectionState", player: int) -> bool:
+    if isinstance(node, FunctionNode):
+        # always called, since a returned string can change how the rest of the chain reads
+        result = node.call(state, player)
+        if isinstance(result, str) and result:
+            for i, (spliced_operator, spliced_negated, spliced_node) in enumerate(node.get_spliced(result, player)):
+                if i == 0:
+                    # the first operand of the string takes the call's place, with its operator and its ! (like "!{f()}" read as "!|A| or |B|")
+                    value = _fold_operand(value, operator, spliced_negated != negated, spliced_node, state, player)
+                else:
+                    value = _fold_operand(value, spliced_operator, spliced_negated, spliced_node, state, player)
+            return value
+        operand = True if isinstance(result, str) else bool(result)
+    elif value is not None and (value if operator == TokenType.OR else not value):
+        return value # the rest of the chain can't change the result so far
+    else:
+        operand = node.evaluate(state, player)
+
+    if negated:
+        operand = not operand
+    if value is None:
+        return operand
+    return (value and operand) if operator == TokenType.AND else (value or operand)
+
+class SpliceNode(RuleNode):
+    """An AND/OR chain with {function()} calls that can return requires strings, kept as a chain so their strings can be spliced into it.\n
+    "|A| and {f()}" with f returning "|B| or |C|" is read as "|A| and |B| or |C|", so true with only |C|."""
+    __slots__ = ("items",)
+
+    def __init__(self, items: tuple[ChainItem, ...]):
+        self.items = items
+
+    def evaluate(self, state: "CollectionState", player: int) -> bool:
+        return evaluate_chain(self.items, state, player)
+
+    def __repr__(self):
+        return f"SpliceNode{self.items}"
+
+class RequiresFunctionError(Exception):
+    """Raised when a function called from a requires raises, so the compiled rule can say which location/region it came from."""
+
+    def __init__(self, func_name: str, args: str, original: Exception):
+        super().__init__(func_name, args, original)
+        self.func_name = func_name
+        self.args = args
+        self.original = original
+
+    def to_runtime_error(self, context: RuleContext) -> RuntimeError:
+        return RuntimeError(f'A call to the function "{self.func_name}" in {context.kind} "{context.name}"\'s requires raised an Exception. \
+                            \nUnless it was called by another function, it should look something like "{{{self.func_name}({self.args})}}" in {context.kind}s.json. \
+                            \nFull error message: \
+                            \n\n{type(self.original).__name__}: {self.original}')
+
+def make_and(children: list[RuleNode]) -> RuleNode:
+    """Combine nodes with AND, flattening nested ANDs and dropping constants."""
+    flattened = []
+    for child in children:
+        if isinstance(child, ConstantNode):
+            if not child.value:
+                return FALSE
+        elif isinstance(child, AndNode):
+            flattened.extend(child.children)
+        else:
+            flattened.append(child)
+    if not flattened:
+        return TRUE
+    if len(flattened) == 1:
+        return flattened[0]
+    return AndNode(tuple(flattened))
+
+def make_or(children: list[RuleNode]) -> RuleNode:
+    """Combine nodes with OR, flattening nested ORs and dropping constants."""
+    flattened = []
+    for child in children:
+        if isinstance(child, ConstantNode):
+            if child.value:
+                return TRUE
+        elif isinstance(child, OrNode):
+            flattened.extend(child.children)
+        else:
+            flattened.append(child)
+    if not flattened:
+        return FALSE
+    if len(flattened) == 1:
+        return flattened[0]
+    return OrNode(tuple(flattened))
+
+def make_not(child: RuleNode) -> RuleNode:
+    if isinstance(child, ConstantNode):
+        return FALSE if child.value else TRUE
+    if isinstance(child, NotNode):
+        return child.child
+    return NotNode(child)
+
+def node_dependencies(node: RuleNode, player: int) -> Optional[frozenset[str]]:
+    """The item names and state.prog_items keys a compiled requires reads for this player, or None if a function/predicate didn't declare them."""
+    if isinstance(node, ItemNode):
+        return frozenset((node.name,))
+    if isinstance(node, CategoryNode):
+        return frozenset((node.key,))
+    if isinstance(node, ConstantNode):
+        return frozenset()
+    if isinstance(node, (NotNode, MemoNode)):
+        return node_dependencies(node.child, player)
+    if isinstance(node, (AndNode, OrNode, SpliceNode)):
+        dependencies = set()
+        for child in (node.children if not isinstance(node, SpliceNode) else [item[2] for item in node.items]):
+            child_dependencies = node_dependencies(child, player)
+            if child_dependencies is None:
+                return None
+            dependencies.update(child_dependencies)
+        return frozenset(dependencies)
+    if isinstance(node, FunctionNode):
+        return get_rule_dependencies(node.func)
+    if isinstance(node, FactoryNode):
+        return get_rule_dependencies(node.predicates[player])
+    if isinstance(node, PredicateNode):
+        return get_rule_dependencies(node.predicate)
+    return None
+
+def node_key(node: RuleNode) -> Any:
+    """A hashable key describing the structure of a node, equal for nodes that check the same thing (ignoring per player bindings)."""
+    if isinstance(node, ConstantNode):
+        return node.value
+    if isinstance(node, ItemNode):
+        return ("item", node.name, node.count)
+    if isinstance(node, CategoryNode):
+        return ("category", node.name, node.count)
+    if isinstance(node, NotNode):
+        return ("not", node_key(node.child))
+    if isinstance(node, MemoNode):
+        return node_key(node.child)
+    if isinstance(node, (AndNode, OrNode)):
+        return ("and" if isinstance(node, AndNode) else "or", tuple(node_key(child) for child in node.children))
+    if isinstance(node, SpliceNode):
+        return ("splice", tuple((operator, negated, node_key(child)) for operator, negated, child in node.items))
+    if isinstance(node, FunctionNode):
+        return ("function", node.func_name, node.args)
+    if isinstance(node, FactoryNode):
+        return ("factory", node.func_name, node.args)
+    return ("node", id(node))
+
+def format_node(node: RuleNode) -> str:
+    """Write a compiled requires back in the requires syntax, as close as possible to what the requires it came from looked like."""
+    if isinstance(node, MemoNode):
+        return format_node(node.child)
+    if isinstance(node, ConstantNode):
+        return "1" if node.value else "0"
+    if isinstance(node, ItemNode):
+        return f"|{node.name}:{node.count}|" if node.count != 1 else f"|{node.name}|"
+    if isinstance(node, CategoryNode):
+        return f"|@{node.name}:{node.count}|" if node.count != 1 else f"|@{node.name}|"
+    if isinstance(node, (FunctionNode, FactoryNode)):
+        return f"{{{node.func_name}({node.args})}}"
+    if isinstance(node, NotNode):
+        return f"!{format_node(node.child)}"
+    if isinstance(node, (AndNode, OrNode)):
+        operator = " and " if isinstance(node, AndNode) else " or "
+        return f"({operator.join(format_node(child) for child in node.children)})"
+    if isinstance(node, SpliceNode):
+        return "(" + "".join((f" {operator.name.lower()} " if operator else "") + ("!" if negated else "") + format_node(child)
+                             for operator, negated, child in node.items) + ")"
+    return repr(node)
+
+def collect_bound_nodes(node: RuleNode, found: list):
+    """Find the nodes of a compiled requires that need a per player binding (FunctionNode, FactoryNode and MemoNode),
+    the nodes under a MemoNode coming before it."""
+    if isinstance(node, (FunctionNode, FactoryNode)):
+        found.append(node)
+    elif isinstance(node, MemoNode):
+        collect_bound_nodes(node.child, found)
+        found.append(node)
+    elif isinstance(node, NotNode):
+        collect_bound_nodes(node.child, found)
+    elif isinstance(node, (AndNode, OrNode)):
+        for child in node.children:
+            collect_bound_nodes(child, found)
+    elif isinstance(node, SpliceNode):
+        for _, _, child in node.items:
+            collect_bound_nodes(child, found)
+    return found
+
+######################
+# Compiled rules
+######################
+
+class CompiledRule:
+    """The access rule given to set_rule/add_rule. Calls the compiled requires of a location or region."""
+    __slots__ = ("root", "player", "context")
+
+    def __init__(self, root: RuleNode, context: RuleContext):
+        self.root = root
+        self.player = context.player
+        self.context = context
+
+    def __call__(self, state: "CollectionState") -> bool:
+        try:
+            return self.root.evaluate(state, self.player)
+        except RequiresFunctionError as ex:
+            raise ex.to_runtime_error(self.context) from ex.original
+
+class RuleCache:
+    """LRU cache of compiled rule results for one player, keyed on the rule and the counts of the items/categories it reads.\n
+    Its estimated size is kept under max_bytes, the least recently used results are dropped first."""
+    ENTRY_BYTES = 170 # what a result takes without its counts: the OrderedDict entry, the key tuple and the empty counts tuple
+    COUNT_BYTES = 8 # and then for each count (the small ints themselves are shared)
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: OrderedDict[tuple, bool] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def entry_size(self, key: tuple) -> int:
+        return self.ENTRY_BYTES + self.COUNT_BYTES * len(key[1])
+
+    def get(self, key: tuple) -> Optional[bool]:
+        result = self.entries.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return result
+
+    def put(self, key: tuple, result: bool):
+        if key not in self.entries:
+            self.size += self.entry_size(key)
+        self.entries[key] = result
+        while self.size > self.max_bytes and self.entries:
+            dropped, _ = self.entries.popitem(last=False)
+            self.size -= self.entry_size(dropped)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __repr__(self):
+        return f"RuleCache({len(self.entries)} entries, {self.size / 1024:.0f}/{self.max_bytes / 1024:.0f} KB, {self.hits} hits, {self.misses} misses, {self.hit_rate:.1%} hit rate)"
+
+class CachedCompiledRule(CompiledRule):
+    """A CompiledRule whose results are kept in the player's RuleCache, keyed on the counts of the items/categories it reads."""
+    __slots__ = ("keys", "cache")
+
+    def __init__(self, root: RuleNode, context: RuleContext, keys: tuple[str, ...], cache: RuleCache):
+        super().__init__(root, context)
+        self.keys = keys
+        self.cache = cache
+
+    def __call__(self, state: "CollectionState") -> bool:
+        prog_items = state.prog_items[self.player]
+        cache_key = (self, tuple([prog_items[key] for key in self.keys]))
+        result = self.cache.get(cache_key)
+        if result is None:
+            result = super().__call__(state)
+            self.cache.put(cache_key, result)
+        return result
+
+def make_compiled_rule(root: RuleNode, context: RuleContext, cache: Optional[RuleCache] = None) -> CompiledRule:
+    """Make the access rule of a compiled requires, using the cache when there's one and the requires is worth caching
+    (more than a single item check, and with known dependencies)."""
+    if cache is None or isinstance(root, (ConstantNode, ItemNode, CategoryNode)):
+        return CompiledRule(root, context)
+
+    dependencies = node_dependencies(root, context.player)
+    if dependencies is None:
+        return CompiledRule(root, context)
+    return CachedCompiledRule(root, context, tuple(sorted(dependencies)), cache)
+
+class RuleDependencyIndex:
+    """Reverse index of the compiled rules of a player, from an item name/state.prog_items key to the locations and entrances whose access rule reads it.\n
+    Rules with undeclared dependencies are listed in always_recheck."""
+
+    def __init__(self, player: int):
+        self.player = player
+        self.by_key: dict[str, set] = {}
+        self.always_recheck: set = set()
+
+    def add(self, spot, node: RuleNode):
+        """Register the compiled requires of a location/entrance. An entrance can be added more than once, one per rule added to it."""
+        dependencies = node_dependencies(node, self.player)
+        if dependencies is None:
+            self.always_recheck.add(spot)
+            return
+        for key in dependencies:
+            self.by_key.setdefault(key, set()).add(spot)
+
+    def get_affected(self, keys) -> set:
+        """The locations/entrances whose access rule may change when any of these counts change."""
+        affected = set(self.always_recheck)
+        for key in keys:
+            affected.update(self.by_key.get(key, ()))
+        return affected
+
+class SharedRequires:
+    """The compiled versions of one requires string, shared by every player through ManualWorld.compiled_requires_cache.\n
+    They are keyed by the fold signature: what the folded functions and relative item counts of the requires resolved to for a player.
+    Players with the same signature use the same node tree, only binding their own FunctionNode/FactoryNode."""
+    __slots__ = ("tokens", "plans")
+
+    def __init__(self, tokens: list[RequiresToken]):
+        self.tokens = tuple(tokens)
+        self.plans: dict[tuple, tuple[RuleNode, tuple[RuleNode, ...]]] = {}
+
+class RequiresCompiler:
+    """Parses requires once per location/region into a tree of RuleNode, instead of re-interpreting the string on every access check."""
+
+    def __init__(self, world: "ManualWorld", profiler: Optional["RulesProfiler"] = None):
+        self.world = world
+        self.profiler = profiler
+        # results of the @rule_constant/@rule_factory functions already called, as they were returned and as nodes, by function name and arguments
+        self.folded_results: dict[tuple[str, str], Any] = {}
+        self.folded_functions: dict[tuple[str, str], RuleNode] = {}
+        # CallPlan of the other functions, by function name and arguments
+        self.call_plans: dict[tuple[str, str], CallPlan] = {}
+
+    def compile(self, context: RuleContext, fallback: Optional[Callable[["CollectionState"], bool]] = None) -> RuleNode:
+        """Compile the requires of a location/region/entrance.\n
+        Structured requires are compiled from their objects and the lists of items into a has_all/has_any rule,
+        anything else is left to the fallback check."""
+        if isinstance(context.requires, str):
+            return self.compile_string(context.requires, context)
+        if isinstance(context.requires, (dict, bool)):
+            root = self.compile_structured(context.requires, context)
+            for node in collect_bound_nodes(root, []):
+                node.bind(self, context)
+            return root
+        if not context.requires:
+            return TRUE
+        if isinstance(context.requires, list):
+            return PredicateNode(compile_requires_list(context.requires, context.player))
+        if fallback is None:
+            return TRUE
+        return PredicateNode(fallback)
+
+    def check_recursion(self, requires: str, context: RuleContext, depth: int):
+        """Raise a RecursionError when a requires returned by functions (or a macro) is nested deeper than rules_functions_maximum_recursion."""
+        if depth > self.world.rules_functions_maximum_recursion:
+            raise RecursionError(f'One or more functions in {context.kind} "{context.name}"\'s requires looped too many time (maximum recursion is {self.world.rules_functions_maximum_recursion}) \
+                                 \n    And the currently processed requires look like this: "{requires}"')
+
+    def compile_string(self, requires: str, context: RuleContext, depth: int = 0) -> RuleNode:
+        self.check_recursion(requires, context, depth)
+
+        shared = self.world.compiled_requires_cache.get(requires)
+        if shared is None:
+            shared = self.world.compiled_requires_cache[requires] = SharedRequires(tokenize_requires(requires))
+        if not shared.tokens:
+            return TRUE
+
+        signature = self.fold_signature(shared.tokens, context, depth)
+        plan = shared.plans.get(signature)
+        if plan is None:
+            root = _RequiresParser(self, self.splice_folded_strings(shared.tokens, context, depth), context, depth).parse()
+            plan = shared.plans[signature] = (root, tuple(collect_bound_nodes(root, [])))
+
+        root, bound_nodes = plan
+        for node in bound_nodes:
+            node.bind(self, context)
+        return root
+
+    def compile_chain(self, requires: str, context: RuleContext, depth: int) -> tuple[ChainItem, ...]:
+        """Compile a requires string returned by a function into the AND/OR chain spliced in place of the call."""
+        self.check_recursion(requires, context, depth)
+
+        tokens = self.splice_folded_strings(tokenize_requires(requires), context, depth)
+        if not tokens:
+            return ((None, False, TRUE),)
+        items = _RequiresParser(self, tokens, context, depth).parse_chain()
+        # it's compiled while evaluating, so the nodes the player's other requires already bound are left as they are
+        for node in collect_bound_nodes(SpliceNode(items), []):
+            if not node.is_bound(context.player):
+                node.bind(self, context)
+        return items
+
+    def splice_folded_strings(self, tokens: tuple[RequiresToken, ...], context: RuleContext, depth: int) -> list[RequiresToken]:
+        """Replace the {function()} tokens of @rule_constant/@rule_factory functions that returned a requires string with the tokens of that string,
+        as if the string was written in place of the call."""
+        spliced = []
+        for token in tokens:
+            if token.type == TokenType.FUNCTION:
+                func = find_rule_function(token.name)
+                if callable(func) and (is_rule_constant(func) or is_rule_factory(func)):
+                    result = self.get_folded_result(func, token, context)
+                    if isinstance(result, str):
+                        self.check_recursion(result, context, depth + 1)
+                        # an empty string is true, like an empty requires
+                        spliced.extend(self.splice_folded_strings(tokenize_requires(result), context, depth + 1) or [RequiresToken(TokenType.NUMBER, "1")])
+                        continue
+            spliced.append(token)
+        return spliced
+
+    def intern(self, node: RuleNode) -> RuleNode:
+        """Hash-cons a node: identical sub-expressions of any requires become the same node, through ManualWorld.compiled_nodes_cache.\n
+        The first time a sub-expression that calls functions is seen, it's wrapped in a MemoNode so it's only evaluated once per state revision."""
+        if isinstance(node, (ConstantNode, MemoNode)):
+            return node
+
+        key = node_key(node)
+        interned = self.world.compiled_nodes_cache.get(key)
+        if interned is None:
+            if isinstance(node, FunctionNode) or (isinstance(node, (AndNode, OrNode, NotNode, SpliceNode)) and collect_bound_nodes(node, [])):
+                interned = MemoNode(node)
+            else:
+                interned = node
+            self.world.compiled_nodes_cache[key] = interned
+        return interned
+
+    def compile_structured(self, requires: Any, context: RuleContext) -> RuleNode:
+        """Compile a structured requires straight from its objects, without tokenizing or parsing anything."""
+        operator, value = structured_requires_parts(requires, context)
+        if operator == "constant":
+            return TRUE if value else FALSE
+        if operator == "and":
+            return self.intern(make_and([self.compile_structured(part, context) for part in value]))
+        if operator == "or":
+            return self.intern(make_or([self.compile_structured(part, context) for part in value]))
+        if operator == "not":
+            return self.intern(make_not(self.compile_structured(value, context)))
+        if value.type == TokenType.FUNCTION:
+            return self.intern(self.compile_function(value, context, 0))
+        if value.type == TokenType.MACRO:
+            return self.compile_macro(value, context, 0)
+        return self.intern(self.compile_item(value, context))
+
+    def fold_signature(self, tokens: tuple[RequiresToken, ...], context: RuleContext, depth: int) -> tuple:
+        """What the parts of a requires that depend on the player's options resolve to: its folded functions and relative item counts."""
+        signature = []
+        for token in tokens:
+            if token.type == TokenType.FUNCTION:
+                func = find_rule_function(token.name)
+                if callable(func) and (is_rule_constant(func) or is_rule_factory(func)):
+                    result = self.get_folded_result(func, token, context)
+                    # a returned requires string is spliced into the requires, so it's part of the signature as it is
+                    signature.append(("string", result) if isinstance(result, str) else node_key(self.get_folded_function(func, token, context, depth)))
+            elif token.type == TokenType.MACRO:
+                signature.append(node_key(self.compile_macro(token, context, depth)))
+            elif token.type in (TokenType.ITEM, TokenType.CATEGORY) and is_relative_count(token.value):
+                signature.append(resolve_item_threshold(self.world, token.name, token.value, token.type == TokenType.CATEGORY))
+        return tuple(signature)
+
+    def compile_function(self, token: RequiresToken, context: RuleContext, depth: int) -> RuleNode:
+        func = find_rule_function(token.name)
+        if not callable(func):
+            raise ValueError(f'Invalid function "{token.name}" in {context.kind} "{context.name}".')
+
+        if is_rule_constant(func) or is_rule_factory(func):
+            return self.get_folded_function(func, token, context, depth)
+
+        return FunctionNode(func, token.name, token.value, depth)
+
+    def compile_macro(self, token: RequiresToken, context: RuleContext, depth: int) -> RuleNode:
+        """A [macro] is compiled like a requires returned by a function, the node tree being shared by every requires using it."""
+        return self.compile_string(find_macro(token.name, context), context, depth + 1)
+
+    def get_call_plan(self, func: Callable, func_name: str, args: str, context: RuleContext) -> CallPlan:
+        plan = self.call_plans.get((func_name, args))
+        if plan is None:
+            plan = make_call_plan(self.world, func, args, context.name)
+            if self.profiler:
+                plan = self.profiler.wrap_call(func_name, plan)
+            self.call_plans[(func_name, args)] = plan
+        return plan
+
+    def get_folded_function(self, func: Callable, token: RequiresToken, context: RuleContext, depth: int) -> RuleNode:
+        folded = self.folded_functions.get((token.name, token.value))
+        if folded is None:
+            folded = self.fold_function(func, token, context, depth)
+            self.folded_functions[(token.name, token.value)] = folded
+        return folded
+
+    def get_folded_result(self, func: Callable, token: RequiresToken, context: RuleContext) -> Any:
+        """Call a @rule_constant or @rule_factory function now, without a CollectionState, once per function name and arguments."""
+        key = (token.name, token.value)
+        if key in self.folded_results:
+            return self.folded_results[key]
+
+        plan = make_call_plan(self.world, func, token.value, context.name)
+        try:
+            start = perf_counter()
+            result = plan(None)
+            if self.profiler:
+                self.profiler.record("folded", token.name, perf_counter() - start, result)
+        except Exception as ex:
+            raise RequiresFunctionError(token.name, token.value, ex).to_runtime_error(context) from ex
+
+        self.folded_results[key] = result
+        return result
+
+    def fold_function(self, func: Callable, token: RequiresToken, context: RuleContext, depth: int) -> RuleNode:
+        """Turn the result of a @rule_constant or @rule_factory function into a node.\n
+        A returned requires string is only compiled on its own here for structured requires, string requires splice it in place of the call."""
+        result = self.get_folded_result(func, token, context)
+
+        if isinstance(result, str):
+            return self.compile_string(result, context, depth + 1)
+        if callable(result):
+            item_counts = getattr(result, "item_counts", None)
+            # when profiling, the item checks aren't lowered into the node tree so their time still shows up as the function's
+            if item_counts is not None and not self.profiler:
+                return make_and([ItemNode(item_name, count) for item_name, count in item_counts.items()])
+            if self.profiler:
+                result = self.profiler.wrap("function", token.name, result)
+            return FactoryNode(token.name, token.value, context.player, result)
+        return TRUE if result else FALSE
+
+    def compile_item(self, token: RequiresToken, context: RuleContext) -> RuleNode:
+        if is_relative_count(token.value):
+            count = resolve_item_threshold(self.world, token.name, token.value, token.type == TokenType.CATEGORY)
+        else:
+            try:
+                count = int(token.value)
+            except ValueError as e:
+                raise ValueError(f"Invalid item count `{token.name}` in {context.kind} \"{context.name}\".") from e
+
+        if token.type == TokenType.CATEGORY:
+            return CategoryNode(token.name, count)
+        return ItemNode(token.name, count)
+
+class _RequiresParser:
+    """Builds the node tree from the tokens. AND and OR share the same precedence and are evaluated left to right.\n
+    A chain with {function()} calls that aren't folded (which could return a requires string to splice) is kept as a SpliceNode."""
+
+    def __init__(self, compiler: RequiresCompiler, tokens: list[RequiresToken], context: RuleContext, depth: int):
+        self.compiler = compiler
+        self.tokens = tokens
+        self.context = context
+        self.depth = depth
+        self.position = 0
+
+    def parse(self) -> RuleNode:
+        node = self.parse_expression()
+        if self.position < len(self.tokens):
+            if self.tokens[self.position].type == TokenType.CLOSE:
+                raise construct_logic_error(self.context, LogicErrorSource.INFIX_TO_POSTFIX)
+            raise construct_logic_error(self.context, LogicErrorSource.EVALUATE_STACK_SIZE)
+        return node
+
+    def parse_chain(self) -> tuple[ChainItem, ...]:
+        items = self.parse_items()
+        if self.position < len(self.tokens):
+            if self.tokens[self.position].type == TokenType.CLOSE:
+                raise construct_logic_error(self.context, LogicErrorSource.INFIX_TO_POSTFIX)
+            raise construct_logic_error(self.context, LogicErrorSource.EVALUATE_STACK_SIZE)
+        return items
+
+    def parse_items(self) -> tuple[ChainItem, ...]:
+        items = [(None, *self.parse_chain_operand())]
+        while self.position < len(self.tokens):
+            operator = self.tokens[self.position].type
+            if operator not in (TokenType.AND, TokenType.OR):
+                break
+            self.position += 1
+            items.append((operator, *self.parse_chain_operand()))
+        return tuple(items)
+
+    def parse_expression(self) -> RuleNode:
+        items = self.parse_items()
+        # a returned string only reads differently from a parenthesized one when there's something around the call to splice it into
+        if any(isinstance(operand, FunctionNode) for _, _, operand in items) and (len(items) > 1 or items[0][1]):
+            return self.compiler.intern(SpliceNode(items))
+
+        node = None
+        for operator, _, operand in items:
+            if isinstance(operand, FunctionNode):
+                operand = self.compiler.intern(operand)
+            if node is None:
+                node = operand
+            else:
+                node = make_and([node, operand]) if operator == TokenType.AND else make_or([node, operand])
+        return self.compiler.intern(node)
+
+    def parse_chain_operand(self) -> tuple[bool, RuleNode]:
+        """An operand of an AND/OR chain, with its ! applied. The ! of a {function()} call that isn't folded is returned instead,
+        since it only applies to the first operand of a returned string."""
+        negations = 0
+        while self.position < len(self.tokens) and self.tokens[self.position].type == TokenType.NOT:
+            negations += 1
+            self.position += 1
+
+        if self.position < len(self.tokens) and self.tokens[self.position].type == TokenType.FUNCTION:
+            token = self.tokens[self.position]
+            self.position += 1
+            node = self.compiler.compile_function(token, self.context, self.depth)
+            if isinstance(node, FunctionNode):
+                return negations % 2 == 1, node
+            node = self.compiler.intern(node)
+        else:
+            node = self.parse_operand()
+
+        for _ in range(negations):
+            node = self.compiler.intern(make_not(node))
+        return False, node
+
+    def parse_operand(self) -> RuleNode:
+        if self.position >= len(self.tokens):
+            raise construct_logic_error(self.context, LogicErrorSource.EVALUATE_POSTFIX)
+
+        token = self.tokens[self.position]
+        self.position += 1
+
+        if token.type == TokenType.NOT:
+            return self.compiler.intern(make_not(self.parse_operand()))
+        if token.type == TokenType.OPEN:
+            node = self.parse_expression()
+            # an unclosed parenthesis is closed by the end of the requires
+            if self.position < len(self.tokens) and self.tokens[self.position].type == TokenType.CLOSE:
+                self.position += 1
+            return node
+        if token.type == TokenType.FUNCTION:
+            return self.compiler.intern(self.compiler.compile_function(token, self.context, self.depth))
+        if token.type == TokenType.MACRO:
+            return self.compiler.compile_macro(token, self.context, self.depth)
+        if token.type in (TokenType.ITEM, TokenType.CATEGORY):
+            return self.compiler.intern(self.compiler.compile_item(token, self.context))
+        if token.type == TokenType.NUMBER:
+            return TRUE if int(token.text) else FALSE
+
+        raise construct_logic_error(self.context, LogicErrorSource.EVALUATE_POSTFIX)
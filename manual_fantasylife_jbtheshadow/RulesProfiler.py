@@ -0,0 +1,138 @@
+from typing import Any, Callable, Optional
+from time import perf_counter
+
+import json
+import os
+
+from .Helpers import get_rule_dependencies
+
+
+class RuleStats:
+    """How many times a location/region/entrance rule or a requires function was checked, how long it took and how often it was true."""
+    __slots__ = ("kind", "name", "count", "time", "true_count", "functions_time")
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.count = 0
+        self.time = 0.0
+        self.true_count = 0
+        self.functions_time = 0.0 # for a location/region/entrance rule, the time spent running the {functions()} of its requires
+
+    @property
+    def true_ratio(self) -> float:
+        return self.true_count / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "name": self.name,
+            "count": self.count,
+            "time": self.time,
+            "true_ratio": self.true_ratio,
+            "functions_time": self.functions_time,
+        }
+
+class ProfiledCall:
+    """Times a compiled {function()} call, while still looking like the CallPlan it wraps."""
+    __slots__ = ("call", "func", "stats", "profiler")
+
+    def __init__(self, call: Callable, stats: RuleStats, profiler: "RulesProfiler"):
+        self.call = call
+        self.func = call.func
+        self.stats = stats
+        self.profiler = profiler
+
+    def __call__(self, state):
+        start = perf_counter()
+        result = self.call(state)
+        self.profiler.record_call(self.stats, perf_counter() - start, result)
+        return result
+
+class RulesProfiler:
+    """Opt-in instrumentation of the rules registered by set_rules, enabled with ManualWorld.rules_profile.\n
+    Keeps a RuleStats per location, region, entrance and requires function, reported ranked by cumulative time."""
+
+    def __init__(self):
+        self.stats: dict[tuple[str, str], RuleStats] = {}
+        # the location/region/entrance rule being checked, whose functions_time the compiled function calls add to
+        self.checking: Optional[RuleStats] = None
+
+    def get_stats(self, kind: str, name: str) -> RuleStats:
+        stats = self.stats.get((kind, name))
+        if stats is None:
+            stats = self.stats[(kind, name)] = RuleStats(kind, name)
+        return stats
+
+    def wrap(self, kind: str, name: str, rule: Callable) -> Callable:
+        """Wrap an access rule or a Callable[[CollectionState], bool] so each call is counted and timed.\n
+        A "function" is also added to the functions_time of the access rule it's called from."""
+        stats = self.get_stats(kind, name)
+
+        if kind == "function":
+            def profiled_rule(state) -> bool:
+                start = perf_counter()
+                result = rule(state)
+                self.record_call(stats, perf_counter() - start, result)
+                return result
+        else:
+            def profiled_rule(state) -> bool:
+                checking = self.checking
+                self.checking = stats
+                start = perf_counter()
+                try:
+                    result = rule(state)
+                finally:
+                    self.checking = checking
+                stats.time += perf_counter() - start
+                stats.count += 1
+                if result:
+                    stats.true_count += 1
+                return result
+
+        dependencies = get_rule_dependencies(rule)
+        if dependencies is not None:
+            profiled_rule.manual_rule_dependencies = dependencies
+        return profiled_rule
+
+    def wrap_call(self, func_name: str, call: Callable) -> ProfiledCall:
+        return ProfiledCall(call, self.get_stats("function", func_name), self)
+
+    def record(self, kind: str, name: str, elapsed: float, result: Any = None):
+        """Add a call that was timed by the caller."""
+        stats = self.get_stats(kind, name)
+        stats.time += elapsed
+        stats.count += 1
+        if result is True or (not isinstance(result, str) and result):
+            stats.true_count += 1
+
+    def record_call(self, stats: RuleStats, elapsed: float, result: Any = None):
+        """Add a compiled function call, to its stats and to the functions_time of the access rule being checked."""
+        stats.time += elapsed
+        stats.count += 1
+        if result is True or (not isinstance(result, str) and result):
+            stats.true_count += 1
+        if self.checking is not None:
+            self.checking.functions_time += elapsed
+
+    def ranked(self) -> list[RuleStats]:
+        return sorted(self.stats.values(), key=lambda stats: stats.time, reverse=True)
+
+    def report_text(self, title: Optional[str] = None) -> str:
+        lines = []
+        if title:
+            lines.append(title)
+            lines.append("")
+        lines.append(f"{'Kind':<10} {'Calls':>10} {'Total ms':>10} {'Avg us':>9} {'True %':>7} {'Funcs ms':>9}  Name")
+        for stats in self.ranked():
+            average = stats.time / stats.count * 1_000_000 if stats.count else 0.0
+            lines.append(f"{stats.kind:<10} {stats.count:>10} {stats.time * 1000:>10.2f} {average:>9.1f} "
+                         f"{stats.true_ratio * 100:>7.1f} {stats.functions_time * 1000:>9.2f}  {stats.name}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, directory: str, base_name: str, title: Optional[str] = None):
+        """Write {base_name}_rules_profile.txt and .json in directory."""
+        with open(os.path.join(directory, f"{base_name}_rules_profile.txt"), 'w', encoding="utf-8") as f:
+            f.write(self.report_text(title))
+        with open(os.path.join(directory, f"{base_name}_rules_profile.json"), 'w', encoding="utf-8") as f:
+            json.dump([stats.to_dict() for stats in self.ranked()], f, indent=2)
@@ -0,0 +1,136 @@
+from typing import TYPE_CHECKING, Any, Optional
+
+from .RulesCompiler import RuleNode, ConstantNode, ItemNode, CategoryNode, AndNode, OrNode, MemoNode, \
+    make_and, make_compiled_rule, node_key, format_node
+
+if TYPE_CHECKING:
+    from BaseClasses import Region
+    from . import ManualWorld
+
+# What is known to be true once a region is reached: the node_key of the checks every path into it made,
+# with the highest count checked for items and categories
+Facts = dict[Any, int]
+
+def fact_key(node: RuleNode) -> Any:
+    if isinstance(node, ItemNode):
+        return ("item", node.name)
+    if isinstance(node, CategoryNode):
+        return ("category", node.name)
+    return node_key(node)
+
+def conjuncts(node: RuleNode) -> list[RuleNode]:
+    """The checks ANDed together at the top of a compiled requires, which all have to be true for it to be true."""
+    inner = node.child if isinstance(node, MemoNode) else node
+    if isinstance(inner, AndNode):
+        return [conjunct for child in inner.children for conjunct in conjuncts(child)]
+    if isinstance(inner, ConstantNode) and inner.value:
+        return []
+    return [node]
+
+def add_facts(facts: Facts, node: RuleNode):
+    for conjunct in conjuncts(node):
+        inner = conjunct.child if isinstance(conjunct, MemoNode) else conjunct
+        count = inner.count if isinstance(inner, (ItemNode, CategoryNode)) else 0
+        key = fact_key(inner)
+        facts[key] = max(facts.get(key, count), count)
+
+def is_implied(node: RuleNode, facts: Facts) -> bool:
+    """Is this check always true when the facts are? Either the same check, the same item/category with a count at most as high,
+    or an OR with one of its options implied."""
+    if isinstance(node, MemoNode):
+        return is_implied(node.child, facts)
+    if isinstance(node, OrNode):
+        return any(is_implied(child, facts) for child in node.children)
+    count = facts.get(fact_key(node))
+    if count is None:
+        return False
+    if isinstance(node, (ItemNode, CategoryNode)):
+        return node.count <= count
+    return True
+
+def is_unchanged(world: "ManualWorld", spot) -> bool:
+    """Is the access rule of this location/entrance still the one made by set_rules from its compiled requires?"""
+    return spot in world.compiled_rule_nodes and spot.access_rule is world.compiled_access_rules.get(spot)
+
+def find_region_facts(world: "ManualWorld") -> dict["Region", Facts]:
+    """What is true on every path from the origin region to each region of the player.\n
+    Each entrance adds the compiled requires set_rules gave it, unless its access rule was changed afterward (eg. by a hook),
+    then only what's true in the region it comes from is kept. Regions with no known path aren't included."""
+    player = world.player
+    origin = world.multiworld.get_region(getattr(world, "origin_region_name", "Menu"), player)
+    regions = [region for region in world.multiworld.get_regions(player) if region is not origin]
+
+    facts: dict["Region", Optional[Facts]] = {region: None for region in regions}
+    facts[origin] = {}
+
+    changed = True
+    while changed:
+        changed = False
+        for region in regions:
+            region_facts: Optional[Facts] = None
+            for entrance in region.entrances:
+                parent = entrance.parent_region
+                if parent is None or parent.player != player:
+                    entrance_facts = {}
+                else:
+                    parent_facts = facts.get(parent)
+                    if parent_facts is None:
+                        continue # no known path to it yet
+                    entrance_facts = dict(parent_facts)
+                    if is_unchanged(world, entrance):
+                        for node in world.compiled_rule_nodes[entrance][1]:
+                            add_facts(entrance_facts, node)
+
+                if region_facts is None:
+                    region_facts = entrance_facts
+                else:
+                    region_facts = {key: min(count, entrance_facts[key]) for key, count in region_facts.items() if key in entrance_facts}
+
+            if region_facts is not None and region_facts != facts[region]:
+                facts[region] = region_facts
+                changed = True
+
+    return {region: region_facts for region, region_facts in facts.items() if region_facts is not None}
+
+def prune_implied_requires(world: "ManualWorld") -> dict[str, list[str]]:
+    """Remove from the compiled location rules of the player the checks that every path into their region already made.\n
+    Returns what was removed, by location name, written in the requires syntax."""
+    region_facts = find_region_facts(world)
+    pruned: dict[str, list[str]] = {}
+
+    profiler = getattr(world, "rules_profiler", None)
+
+    for location in world.multiworld.get_locations(world.player):
+        facts = region_facts.get(location.parent_region)
+        if not facts or not is_unchanged(world, location):
+            continue
+
+        context, nodes = world.compiled_rule_nodes[location]
+        kept = []
+        removed = []
+        for node in nodes:
+            for conjunct in conjuncts(node):
+                (removed if is_implied(conjunct, facts) else kept).append(conjunct)
+        if not removed:
+            continue
+
+        root = make_and(kept)
+        rule = make_compiled_rule(root, context, world.rule_cache)
+        location.access_rule = profiler.wrap("location", location.name, rule) if profiler else rule
+        world.compiled_rule_nodes[location] = (context, [root])
+        world.compiled_access_rules[location] = location.access_rule
+        pruned[location.name] = [format_node(node) for node in removed]
+
+    return pruned
+
+def report_text(pruned: dict[str, list[str]], title: Optional[str] = None) -> str:
+    lines = []
+    if title:
+        lines.append(title)
+        lines.append("")
+    lines.append(f"{sum(len(removed) for removed in pruned.values())} checks removed from {len(pruned)} location rules, "
+                 "already made by every entrance into their region:")
+    lines.append("")
+    for location_name, removed in pruned.items():
+        lines.append(f"{location_name}: {' and '.join(removed)}")
+    return "\n".join(lines) + "\n"
@@ -2,7 +2,8 @@ from base64 import b64encode
 import logging
 import os
 import json
-from typing import Callable, Optional, Counter
+from itertools import groupby
+from typing import Any, Callable, Optional, Counter
 import webbrowser
 
 import Utils
@@ -13,14 +14,20 @@ from .Data import item_table, location_table, region_table, category_table
 from .Game import game_name, filler_item_name, starting_items
 from .Meta import world_description, world_webworld, enable_region_diagram
 from .Locations import location_id_to_name, location_name_to_id, location_name_to_location, location_name_groups, victory_names
-from .Items import item_id_to_name, item_name_to_id, item_name_to_item, item_name_groups
+from .Items import item_id_to_name, item_name_to_id, item_name_to_item, item_name_groups, item_name_to_categories, \
+    item_name_to_prog_items_deltas
 from .DataValidation import runGenerationDataValidation, runPreFillDataValidation
 
 from .Regions import create_regions
-from .Items import ManualItem
+from .Items import ManualItem, ItemPool
 from .Rules import set_rules
+from .RulesCompiler import SharedRequires, RuleNode
+from .RulesBatch import LocationBatchEvaluator, numpy_loaded
+from .RulesPruning import prune_implied_requires, report_text as pruned_requires_report
 from .Options import manual_options_data
-from .Helpers import is_item_enabled, get_option_value, get_items_for_player, resolve_yaml_option, format_state_prog_items_key, ProgItemsCat
+from .HookRegistry import hook_registry
+from .Helpers import is_item_enabled, get_option_value, get_items_for_player, resolve_yaml_option, \
+    make_options_snapshot, make_enabled_categories
 
 from BaseClasses import CollectionState, ItemClassification, Item
 from Options import PerGameCommonOptions
@@ -37,6 +44,22 @@ from .hooks.World import \
     after_collect_item, after_remove_item
 from .hooks.Data import hook_interpret_slot_data
 
+hook_registry.register(
+    hook_get_filler_item_name, before_create_regions, after_create_regions,
+    before_create_items_all, before_create_items_starting, before_create_items_filler, after_create_items,
+    before_create_item, after_create_item,
+    before_set_rules, after_set_rules,
+    before_generate_basic, after_generate_basic,
+    before_fill_slot_data, after_fill_slot_data, before_write_spoiler,
+    before_extend_hint_information, after_extend_hint_information,
+    after_collect_item, after_remove_item,
+    hook_interpret_slot_data)
+# the hooks called for every created item and every collect/remove are left out while they do nothing
+run_before_create_item = hook_registry.is_active(before_create_item)
+run_after_create_item = hook_registry.is_active(after_create_item)
+run_after_collect_item = hook_registry.is_active(after_collect_item)
+run_after_remove_item = hook_registry.is_active(after_remove_item)
+
 class ManualWorld(World):
     __doc__ = world_description
     game: str = game_name
@@ -55,12 +78,20 @@ class ManualWorld(World):
     item_name_to_id = item_name_to_id
     item_name_to_item = item_name_to_item
     item_name_groups = item_name_groups
+    item_name_to_categories = item_name_to_categories
+    item_name_to_prog_items_deltas = item_name_to_prog_items_deltas
 
     filler_item_name = filler_item_name
 
     item_counts: dict[int, Counter[str]] = {}
     item_counts_progression: dict[int, Counter[str]] = {}
+    compiled_requires_cache: dict[str, SharedRequires] # the compiled requires shared by every player of the multiworld, see RulesCompiler.SharedRequires
+    compiled_nodes_cache: dict[Any, RuleNode] # every distinct compiled sub-expression, see RulesCompiler.RequiresCompiler.intern
+    resolved_item_thresholds: dict[int, dict[str, int]] = {} # the 'all'/'half'/'N%' requires counts, frozen once the pool is final. Useful when debugging requires.
     start_inventory = {}
+    options_snapshot = None # the values of the player's options once before_create_regions ran, see Helpers.make_options_snapshot
+    enabled_categories: Optional[frozenset[str]] = None # the categories enabled/disabled by the player's options, see Helpers.make_enabled_categories
+    disabled_categories: Optional[frozenset[str]] = None
 
     location_id_to_name = location_id_to_name
     location_name_to_id = location_name_to_id
@@ -85,17 +116,37 @@ class ManualWorld(World):
                 getattr(self.options, key).value = value
                 regen = True
 
+        # made again from the new values in create_regions
+        self.options_snapshot = None
+        self.enabled_categories = self.disabled_categories = None
+
         regen = hook_interpret_slot_data(self, self.player, slot_data) or regen
         return regen
 
     @classmethod
     def stage_assert_generate(cls, multiworld) -> None:
         runGenerationDataValidation(cls)
-
+        logging.debug(f"{cls.game}: {hook_registry.summary()}")
+
+    def scope_compiled_caches(self) -> None:
+        """The compiled nodes are bound by player number, so they can only be shared by the players of one multiworld.\n
+        Called by set_rules: the caches are shared with the slots of this game that already have them, or start over empty for the first one.
+        They're kept on the worlds, so nothing outlives the multiworld (eg. in the next test or generation in the same process)."""
+        for world in self.multiworld.get_game_worlds(self.game):
+            if world is not self and "compiled_requires_cache" in vars(world):
+                self.compiled_requires_cache = world.compiled_requires_cache
+                self.compiled_nodes_cache = world.compiled_nodes_cache
+                return
+        self.compiled_requires_cache = {}
+        self.compiled_nodes_cache = {}
 
     def create_regions(self):
         before_create_regions(self, self.multiworld, self.player)
 
+        # the options won't be adjusted anymore (except through set_option_value, which refreshes these)
+        self.options_snapshot = make_options_snapshot(self)
+        self.enabled_categories, self.disabled_categories = make_enabled_categories(self)
+
         create_regions(self, self.multiworld, self.player)
 
         location_game_complete = self.multiworld.get_location(victory_names[get_option_value(self.multiworld, self.player, 'goal')], self.player)
@@ -111,7 +162,7 @@ class ManualWorld(World):
 
     def create_items(self):
         # Generate item pool
-        pool: list[Item] = []
+        pool = ItemPool()
         traps = []
         configured_item_names = self.item_id_to_name.copy()
 
@@ -138,9 +189,7 @@ class ManualWorld(World):
             total_created = 0
             if type(configs) is int:
                 total_created = configs
-                for _ in range(configs):
-                    new_item = self.create_item(name)
-                    pool.append(new_item)
+                pool.extend(self.create_items_bulk(name, configs))
             elif type(configs) is dict:
                 for cat, count in configs.items():
                     total_created += count
@@ -157,9 +206,7 @@ class ManualWorld(World):
                         except Exception as ex:
                             raise Exception(f"Item override '{cat}' for {name} improperly defined\n\n{type(ex).__name__}:{ex}")
 
-                    for _ in range(count):
-                        new_item = self.create_item(name, true_class)
-                        pool.append(new_item)
+                    pool.extend(self.create_items_bulk(name, count, true_class))
             else:
                 raise Exception(f"Item override for {name} improperly defined")
 
@@ -191,7 +238,7 @@ class ManualWorld(World):
                     raise Exception(f"Item {name}'s 'local_early' has an invalid value of '{item['local_early']}'. \nA boolean or an integer was expected.")
 
 
-        pool = before_create_items_starting(pool, self, self.multiworld, self.player)
+        pool = self.as_item_pool(before_create_items_starting(pool, self, self.multiworld, self.player))
 
         items_started: list[Item] = []
 
@@ -208,7 +255,7 @@ class ManualWorld(World):
                         continue
 
                 # start with the full pool of items
-                items = pool
+                items = None
 
                 # if the setting lists specific item names, limit the items to just those
                 if "items" in starting_item_block:
@@ -216,10 +263,15 @@ class ManualWorld(World):
 
                 # if the setting lists specific item categories, limit the items to ones that have any of those categories
                 if "item_categories" in starting_item_block:
-                    items_in_categories = [item["name"] for item in self.item_name_to_item.values() if "category" in item and len(set(starting_item_block["item_categories"]).intersection(item["category"])) > 0]
+                    items_in_categories = {item["name"] for item in self.item_name_to_item.values() if "category" in item and len(set(starting_item_block["item_categories"]).intersection(item["category"])) > 0}
                     items = [item for item in pool if item.name in items_in_categories]
 
-                self.random.shuffle(items)
+                if items is None:
+                    # the full pool gets shuffled in place, so the pool keeps that order
+                    pool.shuffle(self.random)
+                    items = pool.copy()
+                else:
+                    self.random.shuffle(items)
 
                 # if the setting lists a specific number of random items that should be pulled, only use a subset equal to that number
                 if "random" in starting_item_block:
@@ -230,11 +282,11 @@ class ManualWorld(World):
                     self.multiworld.push_precollected(starting_item)
                     pool.remove(starting_item)
 
-        self.start_inventory = {i.name: items_started.count(i) for i in items_started}
+        self.start_inventory = dict(Counter(i.name for i in items_started))
 
-        pool = before_create_items_filler(pool, self, self.multiworld, self.player)
+        pool = self.as_item_pool(before_create_items_filler(pool, self, self.multiworld, self.player))
         pool = self.adjust_filler_items(pool, traps)
-        pool = after_create_items(pool, self, self.multiworld, self.player)
+        pool = self.as_item_pool(after_create_items(pool, self, self.multiworld, self.player))
 
         # need to put all of the items in the pool so we can have a full state for placement
         # then will remove specific item placements below from the overall pool
@@ -243,51 +295,85 @@ class ManualWorld(World):
         real_pool = pool + items_started
         self.item_counts[self.player] = self.get_item_counts(pool=real_pool)
         self.item_counts_progression[self.player] = self.get_item_counts(pool=real_pool, only_progression=True)
+        self.resolved_item_thresholds[self.player] = {}
 
     def create_item(self, name: str, class_override: Optional['ItemClassification']=None) -> Item:
-        name = before_create_item(name, self, self.multiworld, self.player)
+        if run_before_create_item:
+            name = before_create_item(name, self, self.multiworld, self.player)
 
-        item = self.item_name_to_item[name]
         if class_override is not None:
             classification = class_override
         else:
-            classification = ItemClassification.filler
-
-            if "trap" in item and item["trap"]:
-                classification |= ItemClassification.trap
-
-            if "useful" in item and item["useful"]:
-                classification |= ItemClassification.useful
-
-            if "progression_skip_balancing" in item and item["progression_skip_balancing"]:
-                classification |= ItemClassification.progression_skip_balancing
-            elif "progression" in item and item["progression"]:
-                classification |= ItemClassification.progression
+            classification = self.get_item_classification(name)
 
         item_object = ManualItem(name, classification,
                         self.item_name_to_id[name], player=self.player)
 
-        item_object = after_create_item(item_object, self, self.multiworld, self.player)
+        if run_after_create_item:
+            item_object = after_create_item(item_object, self, self.multiworld, self.player)
 
         return item_object
 
+    def create_items_bulk(self, name: str, count: int, classification: Optional['ItemClassification']=None) -> list[Item]:
+        """Create count copies of an item, same as calling create_item(name, classification) count times.\n
+        The classification is worked out once for all copies, and the before_create_item/after_create_item hooks
+        aren't called at all while they still just return what they're given."""
+        if count <= 0:
+            return []
+        if run_before_create_item:
+            # the hook could pick another item for each copy
+            return [self.create_item(name, classification) for _ in range(count)]
+
+        if classification is None:
+            classification = self.get_item_classification(name)
+        item_id = self.item_name_to_id[name]
+        items = [ManualItem(name, classification, item_id, player=self.player) for _ in range(count)]
+
+        if run_after_create_item:
+            items = [after_create_item(item, self, self.multiworld, self.player) for item in items]
+        return items
+
+    def get_item_classification(self, name: str) -> ItemClassification:
+        """The classification of an item from its items.json flags."""
+        item = self.item_name_to_item[name]
+        classification = ItemClassification.filler
+
+        if "trap" in item and item["trap"]:
+            classification |= ItemClassification.trap
+
+        if "useful" in item and item["useful"]:
+            classification |= ItemClassification.useful
+
+        if "progression_skip_balancing" in item and item["progression_skip_balancing"]:
+            classification |= ItemClassification.progression_skip_balancing
+        elif "progression" in item and item["progression"]:
+            classification |= ItemClassification.progression
+
+        return classification
+
     # Item Value need a tweaked collect and remove:
     def collect(self, state: CollectionState, item: Item) -> bool:
         change = super().collect(state, item)
-        manual_item = self.item_name_to_item.get(item.name, {})
-        if change and manual_item.get("value"):
-            for key, value in manual_item["value"].items():
-                state.prog_items[item.player][format_state_prog_items_key(ProgItemsCat.VALUE, key)] += int(value)
-        after_collect_item(self, state, change, item)
+        if change:
+            deltas = self.item_name_to_prog_items_deltas.get(item.name)
+            if deltas:
+                prog_items = state.prog_items[item.player]
+                for key, delta in deltas:
+                    prog_items[key] += delta
+        if run_after_collect_item:
+            after_collect_item(self, state, change, item)
         return change
 
     def remove(self, state: CollectionState, item: Item) -> bool:
         change = super().remove(state, item)
-        manual_item = self.item_name_to_item.get(item.name, {})
-        if change and manual_item.get("value"):
-            for key, value in manual_item["value"].items():
-                state.prog_items[item.player][format_state_prog_items_key(ProgItemsCat.VALUE, key)] -= int(value)
-        after_remove_item(self, state, change, item)
+        if change:
+            deltas = self.item_name_to_prog_items_deltas.get(item.name)
+            if deltas:
+                prog_items = state.prog_items[item.player]
+                for key, delta in deltas:
+                    prog_items[key] -= delta
+        if run_after_remove_item:
+            after_remove_item(self, state, change, item)
         return change
 
     def set_rules(self):
@@ -297,6 +383,11 @@ class ManualWorld(World):
 
         after_set_rules(self, self.multiworld, self.player)
 
+        if self.rules_compile_requires and self.rules_prune_implied_requires and not self.location_rules_include_region_requires:
+            self.pruned_requires = prune_implied_requires(self)
+            if self.pruned_requires:
+                logging.debug(f"{self.game} player {self.player}: removed the checks already made by their region from {len(self.pruned_requires)} location rules")
+
     def generate_basic(self):
         before_generate_basic(self, self.multiworld, self.player)
 
@@ -391,14 +482,37 @@ class ManualWorld(World):
         return slot_data
 
     def generate_output(self, output_directory: str):
+        if getattr(self, 'rule_cache', None) is not None:
+            logging.info(f"{self.game} player {self.player} rule cache: {self.rule_cache}")
+
         data = self.client_data()
         filename = f"{self.multiworld.get_out_file_name_base(self.player)}.apmanual"
         with open(os.path.join(output_directory, filename), 'wb') as f:
             f.write(b64encode(bytes(json.dumps(data), 'utf-8')))
 
+        if getattr(self, 'rules_profiler', None) is not None:
+            self.write_rules_profile(output_directory)
+
     def write_spoiler(self, spoiler_handle):
         before_write_spoiler(self, self.multiworld, spoiler_handle)
 
+        if getattr(self, 'rules_profiler', None) is not None and getattr(spoiler_handle, 'name', None):
+            # Written again, now including the checks of the spoiler playthrough
+            self.write_rules_profile(os.path.dirname(os.path.abspath(spoiler_handle.name)))
+
+        if getattr(self, 'pruned_requires', None) and getattr(spoiler_handle, 'name', None):
+            self.write_pruned_requires_report(os.path.dirname(os.path.abspath(spoiler_handle.name)))
+
+    def write_pruned_requires_report(self, directory: str):
+        title = f"Location requires pruned for {self.multiworld.get_player_name(self.player)} ({self.game})"
+        filename = f"{self.multiworld.get_out_file_name_base(self.player)}_pruned_requires.txt"
+        with open(os.path.join(directory, filename), 'w', encoding="utf-8") as f:
+            f.write(pruned_requires_report(self.pruned_requires, title))
+
+    def write_rules_profile(self, directory: str):
+        title = f"Rules profile of {self.multiworld.get_player_name(self.player)} ({self.game})"
+        self.rules_profiler.write_report(directory, self.multiworld.get_out_file_name_base(self.player), title)
+
     def extend_hint_information(self, hint_data: dict[int, dict[int, str]]) -> None:
         before_extend_hint_information(hint_data, self, self.multiworld, self.player)
 
@@ -421,11 +535,53 @@ class ManualWorld(World):
     The maximum time a location/region's requirement can loop to check for functions\n
     One thing to remember is the more you loop the longer generation will take. So probably leave it as is unless you really needs it."""
 
+    rules_compile_requires: bool = True
+    """Default: True\n
+    Compile every location/region's requires once when the rules are set, instead of re-interpreting the requires string on every access check.\n
+    Set it to False to interpret the requires string on every access check instead."""
+
+    location_rules_include_region_requires: bool = False
+    """Default: False\n
+    Since a location can only be reached through its region, and every entrance of that region already checks the region's requires,
+    location access rules only check the location's own requires.\n
+    Set it to True if something checks location access rules without going through their region (or connects entrances after set_rules),
+    so every location also re-checks its region's requires."""
+
+    rules_prune_implied_requires: bool = True
+    """Default: True\n
+    After set_rules (and its hooks), remove from the compiled location rules the checks that every path into their region
+    already made, like a location requiring {origin_island_access()} in a region whose entrances require it too.
+    A check is also removed when it's for an item/category already required in a higher amount on the way there.\n
+    The removed checks are listed next to the spoiler in {output file name}_pruned_requires.txt, showing where the requires are redundant.
+    Access rules changed by hooks are left alone, and it's skipped when location_rules_include_region_requires is True.
+    Set it to False if entrances get connected after set_rules, since the new paths wouldn't have made those checks."""
+
+    rules_cache_max_kilobytes: int = 0
+    """Default: 0 (disabled)\n
+    When above 0, compiled location/entrance rules keep their results in an LRU cache shared by all the rules of the player,
+    keyed on the counts of only the items/categories each rule reads. Useful when the same rules get checked against many states
+    that only differ in unrelated items, like during fill, balancing and the spoiler playthrough.\n
+    This is the memory the cache can take per player, in kilobytes. It's an estimate of what the results and their keys take
+    (around 200 bytes each), the least recently used ones are dropped past it. The hit rate is logged in generate_output."""
+
+    rules_profile: bool = False
+    """Default: False\n
+    Count and time every check of the location/region/entrance rules and of the requires functions, with how often they were true.
+    A report ranked by cumulative time is written next to the spoiler (or the output files without a spoiler) as
+    {output file name}_rules_profile.txt and .json.\n
+    This slows generation down, only enable it when looking for what makes your rules slow."""
+
     def add_filler_items(self, item_pool, traps):
         Utils.deprecate("Use adjust_filler_items instead.")
         return self.adjust_filler_items(item_pool, traps)
 
-    def adjust_filler_items(self, item_pool, traps):
+    @staticmethod
+    def as_item_pool(items: list[Item] | ItemPool) -> ItemPool:
+        """The item pool hooks get an ItemPool, but may still return a list of their own"""
+        return items if isinstance(items, ItemPool) else ItemPool(items)
+
+    def adjust_filler_items(self, item_pool: list[Item] | ItemPool, traps):
+        item_pool = self.as_item_pool(item_pool)
         extras = len(self.multiworld.get_unfilled_locations(player=self.player)) - len(item_pool)
 
         if extras > 0:
@@ -436,21 +592,20 @@ class ManualWorld(World):
             trap_count = extras * trap_percent // 100
             filler_count = extras - trap_count
 
-            for _ in range(0, trap_count):
-                extra_item = self.create_item(self.random.choice(traps))
-                item_pool.append(extra_item)
+            extra_names = [self.random.choice(traps) for _ in range(0, trap_count)]
+            extra_names += [self.get_filler_item_name() for _ in range(0, filler_count)]
 
-            for _ in range(0, filler_count):
-                extra_item = self.create_item(self.get_filler_item_name())
-                item_pool.append(extra_item)
+            # copies of the same item in a row are created together, keeping the pool in the same order
+            for name, copies in groupby(extra_names):
+                item_pool.extend(self.create_items_bulk(name, len(list(copies))))
         elif extras < 0:
             logging.warning(f"{self.game} has more items than locations. {abs(extras)} non-progression items will be removed at random.")
             # Filler is only assigned if the item doesn't have any other tags, so it only has to be covered by itself.
             # Skip Balancing is also not covered due to how it's only supported when paired with Progression.
             # As a result, these cover every possible combination can be removed.
-            fillers = [item for item in item_pool if item.classification == ItemClassification.filler]
-            traps = [item for item in item_pool if item.classification == ItemClassification.trap]
-            useful = [item for item in item_pool if item.classification == ItemClassification.useful]
+            fillers = item_pool.with_classification(ItemClassification.filler)
+            traps = item_pool.with_classification(ItemClassification.trap)
+            useful = item_pool.with_classification(ItemClassification.useful)
             # Useful + Trap is classified separately so that it can have a unique priority ranking.
             useful_traps = [item for item in item_pool if
                             ItemClassification.progression not in item.classification
@@ -499,6 +654,38 @@ class ManualWorld(World):
         else:
             return self.item_counts.get(player, Counter())
 
+    def evaluate_all_locations(self, state: CollectionState):
+        """Returns whether each of the player's locations can be reached with the given state,
+        in the same order as multiworld.get_locations(player).\n
+        With NumPy installed the result is a numpy bool array and the compiled location rules are all checked at once,
+        locations with function calls fall back to their own access rule.
+        Without it, it's a list of location.can_reach(state).\n
+        Call this after set_rules (and its hooks) is done, the rules are lowered the first time this is called."""
+        if not numpy_loaded:
+            return [location.can_reach(state) for location in self.multiworld.get_locations(self.player)]
+
+        if not hasattr(self, 'location_batch_evaluator'):
+            self.location_batch_evaluator = LocationBatchEvaluator(self)
+        return self.location_batch_evaluator.evaluate(state)
+
+
+    def get_rules_to_recheck(self, item: Item) -> set:
+        """Returns the locations and entrances of this player whose access rule may change when this item is collected or removed.\n
+        Uses the dependency index built while compiling the requires, so rules are found through the item's name, categories and values,
+        and through the dependencies declared by requires functions with @rule_dependencies.
+        Rules with unknown dependencies are always included: those of functions without declared dependencies,
+        and the access rules that were replaced or wrapped after set_rules (eg. by after_set_rules) or added later.
+        Without compiled requires every location and entrance is returned."""
+        index = getattr(self, 'rule_dependency_index', None)
+        spots = [*self.multiworld.get_locations(self.player), *self.multiworld.get_entrances(self.player)]
+        if index is None:
+            return set(spots)
+
+        keys = [item.name]
+        keys.extend(key for key, _ in self.item_name_to_prog_items_deltas.get(item.name, ()))
+        affected = index.get_affected(keys)
+        affected.update(spot for spot in spots if spot.access_rule is not self.compiled_access_rules.get(spot))
+        return affected
 
     def client_data(self):
         return {
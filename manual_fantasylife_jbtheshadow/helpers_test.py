@@ -0,0 +1,86 @@
+from dataclasses import FrozenInstanceError
+
+from test.TestBase import WorldTestBase
+
+from .Data import category_table, item_table, location_table
+from .Game import game_name
+from .Helpers import get_option_value, is_category_enabled, is_item_name_enabled, is_location_name_enabled, is_option_enabled
+from .hooks.Helpers import set_option_value
+
+
+class OptionsSnapshotTest(WorldTestBase):
+    game = game_name
+    options = {"licenses": 1, "progressive_licenses": 1, "dlc": 0}
+
+    def test_snapshot_has_the_option_values(self):
+        snapshot = self.world.options_snapshot
+        self.assertIsNotNone(snapshot)
+        for name in self.world.options_dataclass.type_hints:
+            with self.subTest(name):
+                self.assertEqual(getattr(self.world.options, name).value, getattr(snapshot, name))
+                self.assertEqual(getattr(self.world.options, name).value, get_option_value(self.multiworld, self.player, name))
+        self.assertEqual(0, get_option_value(self.multiworld, self.player, "not_an_option"))
+
+        with self.assertRaises(FrozenInstanceError):
+            snapshot.dlc = 1
+
+    def test_set_option_value(self):
+        """Options changed through set_option_value are read from the snapshot made again"""
+        self.assertFalse(is_option_enabled(self.multiworld, self.player, "dlc"))
+        set_option_value(self.multiworld, self.player, "dlc", 1)
+        self.assertTrue(is_option_enabled(self.multiworld, self.player, "dlc"))
+        self.assertEqual(1, self.world.options_snapshot.dlc)
+
+    def test_slot_data_drops_the_snapshot(self):
+        """The options given by slot_data (eg. to a tracker) are read from world.options until the regions are made again"""
+        self.world.interpret_slot_data({"dlc": 1})
+        self.assertIsNone(self.world.options_snapshot)
+        self.assertTrue(is_option_enabled(self.multiworld, self.player, "dlc"))
+
+
+class EnabledCategoriesTest(WorldTestBase):
+    game = game_name
+    options = {"licenses": 1, "progressive_licenses": 1, "dlc": 0}
+
+    def check_categories(self):
+        """Each category is enabled or disabled as it is when checked without the cached sets"""
+        enabled, disabled = self.world.enabled_categories, self.world.disabled_categories
+        self.world.enabled_categories = self.world.disabled_categories = None
+        try:
+            for category in enabled | disabled:
+                with self.subTest(category):
+                    self.assertEqual(category in enabled, is_category_enabled(self.multiworld, self.player, category))
+        finally:
+            self.world.enabled_categories, self.world.disabled_categories = enabled, disabled
+
+    def test_every_category_is_checked(self):
+        categories = set(category_table)
+        for object in item_table + location_table:
+            categories.update(object.get("category", []))
+
+        self.assertEqual(categories, self.world.enabled_categories | self.world.disabled_categories)
+        self.assertFalse(self.world.enabled_categories & self.world.disabled_categories)
+        self.assertIn("Progressive Licenses", self.world.enabled_categories)
+        self.assertIn("DLC", self.world.disabled_categories)
+        self.check_categories()
+
+    def test_set_option_value(self):
+        """Categories are checked again when an option is changed through set_option_value"""
+        dlc_locations = [location["name"] for location in location_table if "DLC" in location.get("category", [])]
+        single_licenses = [item["name"] for item in item_table if "Single Licenses" in item.get("category", [])]
+        self.assertFalse(any(is_location_name_enabled(self.multiworld, self.player, name) for name in dlc_locations))
+        self.assertFalse(any(is_item_name_enabled(self.multiworld, self.player, name) for name in single_licenses))
+
+        set_option_value(self.multiworld, self.player, "dlc", 1)
+        set_option_value(self.multiworld, self.player, "progressive_licenses", 0)
+        self.assertIn("DLC", self.world.enabled_categories)
+        self.assertIn("Single Licenses", self.world.enabled_categories)
+        self.assertIn("Progressive Licenses", self.world.disabled_categories)
+        self.check_categories()
+        self.assertTrue(any(is_location_name_enabled(self.multiworld, self.player, name) for name in dlc_locations))
+        self.assertTrue(any(is_item_name_enabled(self.multiworld, self.player, name) for name in single_licenses))
+
+    def test_slot_data_drops_the_categories(self):
+        self.world.interpret_slot_data({"dlc": 1})
+        self.assertIsNone(self.world.enabled_categories)
+        self.assertTrue(is_category_enabled(self.multiworld, self.player, "DLC"))
@@ -83,3 +83,5 @@ def set_option_value(multiworld: MultiWorld, player: int, name: str, value: Unio
 
     option.value = value
     setattr(multiworld.worlds[player].options, name, option)
+    Helpers.refresh_options_snapshot(multiworld.worlds[player])
+    Helpers.refresh_enabled_categories(multiworld.worlds[player])
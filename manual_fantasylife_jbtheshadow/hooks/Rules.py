@@ -1,6 +1,7 @@
 from typing import Optional
 from worlds.AutoWorld import World
-from ..Helpers import clamp, get_items_with_value, get_option_value, is_option_enabled
+from ..Helpers import clamp, get_items_with_value, get_option_value, is_option_enabled, rule_constant, rule_factory, \
+    item_counts_rule, rule_dependencies, get_rule_dependencies
 from BaseClasses import MultiWorld, CollectionState
 
 from ..data.Data import Life, Rank
@@ -37,15 +38,24 @@ def anyClassLevel(state: CollectionState, player: int, level: str):
 
 
 # You can also return a string from your function, and it will be evaluated as a requires string.
+# The string takes the place of the call as it is, without parentheses: with requiresMelee below,
+# "|Bigger Bag| and {requiresMelee()}" reads as "|Bigger Bag| and |Figher Level:15| or |Black Belt Level:15| or |Thief Level:15|",
+# which (AND and OR being read left to right) is true with only Thief Level:15. Put parentheses around the call, or in the string, to group it.
+# If the result only depends on the yaml options, decorate the function with @rule_constant so it is only
+# called once per player and its result is folded into the compiled requires.
+@rule_constant
 def requiresMelee():
     """Returns a requires string that checks if the player has unlocked the tank."""
     return "|Figher Level:15| or |Black Belt Level:15| or |Thief Level:15|"
 
 
-def wish_hunt(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    def beat_main_story():
-        return state.has("Chapter Complete", player, 7)
-
+# If only the final state.has(...) depends on the CollectionState, decorate the function with @rule_factory and leave
+# out the state argument. It is called once per player with the literal arguments, and returns the
+# Callable[[CollectionState], bool] (or a plain bool) used every time the requires is checked.
+# Returning item_counts_rule(...) lets compiled requires treat the result like |item:count| requirements.
+# Other returned rules should declare the items they check with @rule_dependencies(...), or they get re-checked after every item.
+@rule_factory
+def wish_hunt(world: World, multiworld: MultiWorld, player: int):
     goal = get_option_value(multiworld, player, "goal")
     if goal != Options.Goal.option_wish_hunt:
         return True
@@ -53,13 +63,14 @@ def wish_hunt(world: World, multiworld: MultiWorld, state: CollectionState, play
     required = get_option_value(multiworld, player, "wish_hunt_required")
     main_story = is_option_enabled(multiworld, player, "require_main_story_for_goal")
 
-    return state.has("Lost Wish", player, required) and (not main_story or beat_main_story())
-
+    item_counts = {"Lost Wish": required}
+    if main_story:
+        item_counts["Chapter Complete"] = 7
+    return item_counts_rule(player, item_counts)
 
-def life_mastery(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    def beat_main_story():
-        return state.has("Chapter Complete", player, 7)
 
+@rule_factory
+def life_mastery(world: World, multiworld: MultiWorld, player: int):
     goal = get_option_value(multiworld, player, "goal")
     if goal != Options.Goal.option_life_mastery:
         return True
@@ -67,166 +78,203 @@ def life_mastery(world: World, multiworld: MultiWorld, state: CollectionState, p
     main_story = is_option_enabled(multiworld, player, "require_main_story_for_goal")
     licenses = is_option_enabled(multiworld, player, "licenses")
     if not licenses:
-        return not main_story or beat_main_story()
+        return item_counts_rule(player, {"Chapter Complete": 7}) if main_story else True
 
     progressive_licenses = is_option_enabled(multiworld, player, "progressive_licenses")
     fast_licenses = is_option_enabled(multiworld, player, "fast_licenses")
     life_mastery_rank = get_option_value(multiworld, player, "life_mastery_rank")
     life_mastery_count = get_option_value(multiworld, player, "life_mastery_count")
 
-    if goal == Options.Goal.option_life_mastery and licenses:
-        if not progressive_licenses:
-            item_name = "{life} License"
-            item_count = 1
-        else:
-            item_name = "Fast Progressive {life} License" if fast_licenses else "Progressive {life} License"
-            rank = Rank(life_mastery_rank)
-            item_count = rank.fast_requirement if fast_licenses else rank.full_requirement
+    if not progressive_licenses:
+        item_name = "{life} License"
+        item_count = 1
+    else:
+        item_name = "Fast Progressive {life} License" if fast_licenses else "Progressive {life} License"
+        rank = Rank(life_mastery_rank)
+        item_count = rank.fast_requirement if fast_licenses else rank.full_requirement
+
+    license_names = tuple(item_name.replace("{life}", life.description) for life in Life)
+
+    @rule_dependencies("Chapter Complete", *license_names)
+    def mastered_lives(state: CollectionState) -> bool:
+        if main_story and not state.has("Chapter Complete", player, 7):
+            return False
 
         life_count = 0
-        for life in Life:
-            if state.has(item_name.replace("{life}", life.description), player, item_count):
+        for license_name in license_names:
+            if state.has(license_name, player, item_count):
                 life_count += 1
-            if life_count >= life_mastery_count:
-                return not main_story or beat_main_story()
+                if life_count >= life_mastery_count:
+                    return True
+        return life_count >= life_mastery_count
 
-    return False
+    return mastered_lives
 
 
-def has_license(world: World, multiworld: MultiWorld, state: CollectionState, player: int, rank_and_life: str):
+@rule_factory
+def has_license(world: World, multiworld: MultiWorld, player: int, rank_and_life: str):
     parts = rank_and_life.split()
     if len(parts) != 2:
         raise Exception(f"Invalid rank and life parameter '{rank_and_life}'.")
 
     life = Life.from_description(parts[1])
+    item_counts = {}
     enable_item_restrictions = is_option_enabled(multiworld, player, "enable_item_restrictions")
     if enable_item_restrictions:
-        if not state.has_all(life.required_items, player):
-            return False
+        item_counts.update({item_name: 1 for item_name in life.required_items})
 
     licenses = is_option_enabled(multiworld, player, "licenses")
     if not licenses:
-        return True
+        return item_counts_rule(player, item_counts) if item_counts else True
 
     rank = Rank.from_description(parts[0])
 
     progressive_licenses = is_option_enabled(multiworld, player, "progressive_licenses")
     if not progressive_licenses:
-        return state.has(f"{life.description} License", player)
+        item_counts[f"{life.description} License"] = 1
+        return item_counts_rule(player, item_counts)
 
-    if rank.min_chapter and not state.has("Chapter Complete", player, rank.min_chapter):
-        return False
+    if rank.min_chapter:
+        item_counts["Chapter Complete"] = rank.min_chapter
 
     fast_licenses = is_option_enabled(multiworld, player, "fast_licenses")
     if not fast_licenses:
-        return state.has(f"Progressive {life.description} License", player, rank.full_requirement)
-
-    return state.has(f"Fast Progressive {life.description} License", player, rank.fast_requirement)
+        item_counts[f"Progressive {life.description} License"] = rank.full_requirement
+    else:
+        item_counts[f"Fast Progressive {life.description} License"] = rank.fast_requirement
+    return item_counts_rule(player, item_counts)
 
 
-def item_restrictions(world: World, multiworld: MultiWorld, state: CollectionState, player: int, count_str: str):
+@rule_factory
+def item_restrictions(world: World, multiworld: MultiWorld, player: int, count_str: str):
     if not is_option_enabled(multiworld, player, "enable_item_restrictions"):
         return True
 
     count_str = count_str.strip()
     count = int(count_str) if count_str.isnumeric() else 0
-    return state.has_group("Item Restrictions", player, count)
+    return rule_dependencies(*world.item_name_groups["Item Restrictions"])(
+        lambda state: state.has_group("Item Restrictions", player, count))
 
 
-def bliss_bonuses(world: World, multiworld: MultiWorld, state: CollectionState, player: int, count_str: str):
+@rule_factory
+def bliss_bonuses(world: World, multiworld: MultiWorld, player: int, count_str: str):
     if not is_option_enabled(multiworld, player, "bliss_bonuses"):
         return True
 
     count_str = count_str.strip()
     count = int(count_str) if count_str.isnumeric() else 0
-    return state.has_group("Bliss Bonuses", player, count)
+    return rule_dependencies(*world.item_name_groups["Bliss Bonuses"])(
+        lambda state: state.has_group("Bliss Bonuses", player, count))
 
 
-def can_fight(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
+@rule_factory
+def can_fight(world: World, multiworld: MultiWorld, player: int):
     if not is_option_enabled(multiworld, player, "enable_item_restrictions"):
         return True
 
-    return state.has_any(["Daggers", "Longswords", "Greatswords", "Bows", "Wands"], player)
+    weapons = ["Daggers", "Longswords", "Greatswords", "Bows", "Wands"]
+    return rule_dependencies(*weapons)(lambda state: state.has_any(weapons, player))
 
 
-def can_cast_magic(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return has_license(world, multiworld, state, player, f"{Rank.FLEDGLING.description} {Life.MAGICIAN.description}")
+@rule_factory
+def can_cast_magic(world: World, multiworld: MultiWorld, player: int):
+    return has_license(world, multiworld, player, f"{Rank.FLEDGLING.description} {Life.MAGICIAN.description}")
 
 
-def can_heal(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return state.has("HP Recovery Items", player) or can_cast_magic(world, multiworld, state, player)
+@rule_factory
+def can_heal(world: World, multiworld: MultiWorld, player: int):
+    cast_magic = can_cast_magic(world, multiworld, player)
+    if cast_magic is True:
+        return True
+
+    return rule_dependencies("HP Recovery Items", *get_rule_dependencies(cast_magic))(
+        lambda state: state.has("HP Recovery Items", player) or cast_magic(state))
 
 
-def completed_chapter(world: World, multiworld: MultiWorld, state: CollectionState, player: int, chapter_str: str):
+@rule_factory
+def completed_chapter(world: World, multiworld: MultiWorld, player: int, chapter_str: str):
     chapter_str = chapter_str.strip()
     chapter = int(chapter_str) if chapter_str.isnumeric() else 1
-    return state.has("Chapter Complete", player, chapter)
+    return item_counts_rule(player, {"Chapter Complete": chapter})
 
 
-def completed_intermission(
-    world: World, multiworld: MultiWorld, state: CollectionState, player: int, intermission_str: str
-):
+@rule_factory
+def completed_intermission(world: World, multiworld: MultiWorld, player: int, intermission_str: str):
     intermission_str = intermission_str.strip()
     intermission = int(intermission_str) if intermission_str.isnumeric() else 1
-    return state.has("Intermission Complete", player, intermission)
+    return item_counts_rule(player, {"Intermission Complete": intermission})
 
 
-def west_grassy_plains_access(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_chapter(world, multiworld, state, player, "1")
+@rule_factory
+def west_grassy_plains_access(world: World, multiworld: MultiWorld, player: int):
+    return completed_chapter(world, multiworld, player, "1")
 
 
-def snowpeak_access(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_chapter(world, multiworld, state, player, "2")
+@rule_factory
+def snowpeak_access(world: World, multiworld: MultiWorld, player: int):
+    return completed_chapter(world, multiworld, player, "2")
 
 
-def port_puerto_access(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_chapter(world, multiworld, state, player, "3")
+@rule_factory
+def port_puerto_access(world: World, multiworld: MultiWorld, player: int):
+    return completed_chapter(world, multiworld, player, "3")
 
 
-def al_maajik_access(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_chapter(world, multiworld, state, player, "4")
+@rule_factory
+def al_maajik_access(world: World, multiworld: MultiWorld, player: int):
+    return completed_chapter(world, multiworld, player, "4")
 
 
-def elderwood_village_access(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_chapter(world, multiworld, state, player, "5")
+@rule_factory
+def elderwood_village_access(world: World, multiworld: MultiWorld, player: int):
+    return completed_chapter(world, multiworld, player, "5")
 
 
-def terra_nimbus_access(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_chapter(world, multiworld, state, player, "6")
+@rule_factory
+def terra_nimbus_access(world: World, multiworld: MultiWorld, player: int):
+    return completed_chapter(world, multiworld, player, "6")
 
 
-def finished_storyline(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_chapter(world, multiworld, state, player, "7")
+@rule_factory
+def finished_storyline(world: World, multiworld: MultiWorld, player: int):
+    return completed_chapter(world, multiworld, player, "7")
 
 
-def origin_island_access(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_intermission(world, multiworld, state, player, "8")
+@rule_factory
+def origin_island_access(world: World, multiworld: MultiWorld, player: int):
+    return completed_intermission(world, multiworld, player, "8")
 
 
-def trials_access(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return completed_chapter(world, multiworld, state, player, "9")
+@rule_factory
+def trials_access(world: World, multiworld: MultiWorld, player: int):
+    return completed_chapter(world, multiworld, player, "9")
 
 
-def has_better_shopping(world: World, multiworld: MultiWorld, state: CollectionState, player: int, number_str: str):
+@rule_factory
+def has_better_shopping(world: World, multiworld: MultiWorld, player: int, number_str: str):
     if not is_option_enabled(multiworld, player, "bliss_bonuses"):
         return True
 
     number_str = number_str.strip()
     number = int(number_str) if number_str.isnumeric() else 1
-    return state.has("Better Shopping", player, number)
+    return item_counts_rule(player, {"Better Shopping": number})
 
 
-def better_castele_shopping(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return has_better_shopping(world, multiworld, state, player, "1")
+@rule_factory
+def better_castele_shopping(world: World, multiworld: MultiWorld, player: int):
+    return has_better_shopping(world, multiworld, player, "1")
 
 
-def better_port_shopping(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return has_better_shopping(world, multiworld, state, player, "2")
+@rule_factory
+def better_port_shopping(world: World, multiworld: MultiWorld, player: int):
+    return has_better_shopping(world, multiworld, player, "2")
 
 
-def better_desert_shopping(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return has_better_shopping(world, multiworld, state, player, "3")
+@rule_factory
+def better_desert_shopping(world: World, multiworld: MultiWorld, player: int):
+    return has_better_shopping(world, multiworld, player, "3")
 
 
-def better_traveling_shopping(world: World, multiworld: MultiWorld, state: CollectionState, player: int):
-    return has_better_shopping(world, multiworld, state, player, "4")
+@rule_factory
+def better_traveling_shopping(world: World, multiworld: MultiWorld, player: int):
+    return has_better_shopping(world, multiworld, player, "4")
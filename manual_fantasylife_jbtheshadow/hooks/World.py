@@ -3,7 +3,7 @@ from worlds.AutoWorld import World
 from BaseClasses import MultiWorld, CollectionState, Item
 
 # Object classes from Manual -- extending AP core -- representing items and locations that are used in generation
-from ..Items import ManualItem
+from ..Items import ManualItem, ItemPool
 from ..Locations import ManualLocation
 
 from ..data.Data import FILLER_ITEMS, FillerCategory, Life
@@ -19,6 +19,7 @@ from ..Helpers import is_option_enabled, get_option_value, format_state_prog_ite
 
 # calling logging.info("message") anywhere below in this file will output the message to both console and log file
 import logging
+from collections import Counter
 
 ########################################################################################
 ## Order of method calls when the world generates:
@@ -124,13 +125,16 @@ def before_create_items_all(
     return item_config
 
 
+# The item pool hooks get an ItemPool, which works like a list of items but can also remove or precollect copies of an item by name
+# without searching the whole pool, eg. item_pool.remove_n("Item Name", 3) or item_pool.precollect_n("Item Name", 1, multiworld)
+
 # The item pool before starting items are processed, in case you want to see the raw item pool at that stage
-def before_create_items_starting(item_pool: list, world: World, multiworld: MultiWorld, player: int) -> list:
+def before_create_items_starting(item_pool: ItemPool, world: World, multiworld: MultiWorld, player: int) -> ItemPool:
     return item_pool
 
 
 # The item pool after starting items are processed but before filler is added, in case you want to see the raw item pool at that stage
-def before_create_items_filler(item_pool: list, world: World, multiworld: MultiWorld, player: int) -> list:
+def before_create_items_filler(item_pool: ItemPool, world: World, multiworld: MultiWorld, player: int) -> ItemPool:
     # Use this hook to remove items from the item pool
     item_names_to_remove = []  # List of item names
     starting_inventory = []
@@ -229,27 +233,23 @@ def before_create_items_filler(item_pool: list, world: World, multiworld: MultiW
         if item_name:
             starting_inventory.append(item_name)
 
-    for item_name in item_names_to_remove:
-        item = next(i for i in item_pool if i.name == item_name)
-        item_pool.remove(item)
+    for item_name, count in Counter(item_names_to_remove).items():
+        item_pool.remove_n(item_name, count)
 
     for item_name in starting_inventory:
-        item = next(i for i in item_pool if i.name == item_name)
-        multiworld.push_precollected(item)
-        item_pool.remove(item)
+        item_pool.precollect_n(item_name, 1, multiworld)
     return item_pool
 
     # Some other useful hook options:
 
     ## Place an item at a specific location
     # location = next(l for l in multiworld.get_unfilled_locations(player=player) if l.name == "Location Name")
-    # item_to_place = next(i for i in item_pool if i.name == "Item Name")
+    # item_to_place = item_pool.remove_n("Item Name", 1)[0]
     # location.place_locked_item(item_to_place)
-    # item_pool.remove(item_to_place)
 
 
 # The complete item pool prior to being set for generation is provided here, in case you want to make changes to it
-def after_create_items(item_pool: list, world: World, multiworld: MultiWorld, player: int) -> list:
+def after_create_items(item_pool: ItemPool, world: World, multiworld: MultiWorld, player: int) -> ItemPool:
     return item_pool
 
 
@@ -299,6 +299,9 @@ def after_generate_basic(world: World, multiworld: MultiWorld, player: int):
     pass
 
 
+# Hooks left as they come (only `pass`, or only returning what they're given) aren't called where they'd run often, like the two below.
+# Decorate a hook with @noop_hook (from ..HookRegistry) if it does nothing worth calling in a way that can't be told from its code.
+
 # This method is run every time an item is added to the state, can be used to modify the value of an item.
 # IMPORTANT! Any changes made in this hook must be cancelled/undone in after_remove_item
 def after_collect_item(world: World, state: CollectionState, Changed: bool, item: Item):
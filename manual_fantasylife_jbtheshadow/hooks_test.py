@@ -0,0 +1,102 @@
+import logging
+import unittest
+
+from .HookRegistry import get_hook_kind, HookKind, HookRegistry, is_identity_function, is_noop_function, noop_hook
+
+
+def passes(item, world):
+    pass
+
+def documented(world, multiworld, player):
+    """Only a docstring, like most of the hooks as they come."""
+    # and a comment
+
+def returns_none(item):
+    return None
+
+def returns_item(item, world, multiworld, player):
+    """Returns the item as it was given."""
+    return item
+
+def returns_world(item, world):
+    return world
+
+def returns_false(item):
+    return False
+
+def logs(item):
+    logging.debug(item)
+
+def changes_item(item):
+    item.classification = 0
+    return item
+
+def returns_a_copy(item):
+    return list(item)
+
+def returns_no_argument():
+    return None
+
+def returns_arguments(*args):
+    return args
+
+def assigns_then_returns(item):
+    copy = item
+    return copy
+
+@noop_hook
+def only_logs(item):
+    logging.debug(item)
+    return item
+
+
+class HookRegistryTest(unittest.TestCase):
+    def test_noop_functions(self):
+        for func in (passes, documented, returns_none, returns_no_argument, lambda: None):
+            with self.subTest(func.__name__):
+                self.assertTrue(is_noop_function(func))
+
+        for func in (returns_item, returns_false, logs, changes_item, returns_arguments, only_logs, len, lambda item: item):
+            with self.subTest(func.__name__):
+                self.assertFalse(is_noop_function(func))
+
+    def test_identity_functions(self):
+        for func in (returns_item, lambda item: item):
+            with self.subTest(func.__name__):
+                self.assertTrue(is_identity_function(func))
+
+        for func in (passes, returns_none, returns_world, returns_false, changes_item, returns_a_copy, returns_no_argument,
+                     returns_arguments, assigns_then_returns, len):
+            with self.subTest(func.__name__):
+                self.assertFalse(is_identity_function(func))
+
+    def test_hook_kinds(self):
+        self.assertEqual(HookKind.NOOP, get_hook_kind(documented))
+        self.assertEqual(HookKind.IDENTITY, get_hook_kind(returns_item))
+        self.assertEqual(HookKind.MARKED, get_hook_kind(only_logs))
+        self.assertEqual(HookKind.ACTIVE, get_hook_kind(changes_item))
+
+    def test_is_active(self):
+        registry = HookRegistry()
+        registry.register(documented, returns_item, only_logs, changes_item)
+
+        self.assertFalse(registry.is_active(documented))
+        self.assertFalse(registry.is_active(returns_item))
+        self.assertFalse(registry.is_active(only_logs))
+        self.assertTrue(registry.is_active(changes_item))
+        # hooks that weren't registered, or were replaced since, are always called
+        self.assertTrue(registry.is_active(passes))
+        def replaced(item):
+            logging.debug(item)
+            return item
+        replaced.__name__ = returns_item.__name__
+        self.assertTrue(registry.is_active(replaced))
+
+    def test_summary(self):
+        registry = HookRegistry()
+        self.assertEqual("Active hooks: none\nHooks doing nothing: none", registry.summary())
+
+        registry.register(documented, returns_item, only_logs, changes_item)
+        self.assertEqual("Active hooks: hooks_test.changes_item\n"
+                         "Hooks doing nothing: hooks_test.documented (noop), hooks_test.returns_item (identity), hooks_test.only_logs (marked)",
+                         registry.summary())
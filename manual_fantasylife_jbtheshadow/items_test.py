@@ -0,0 +1,159 @@
+import random
+from unittest.mock import patch
+
+from BaseClasses import ItemClassification
+from test.TestBase import WorldTestBase
+
+from . import ManualWorld
+from .Game import game_name
+from .Items import ItemPool
+
+NAMES = ["Lost Wish", "Bigger Bag", "Prologue Complete", "Chapter Complete"]
+
+
+class ItemPoolTest(WorldTestBase):
+    game = game_name
+
+    def make_items(self, *names: str, classification: ItemClassification = ItemClassification.filler) -> list:
+        return [self.world.create_item(name, classification) for name in names]
+
+    def assertPool(self, expected: list, pool: ItemPool):
+        """The pool has exactly these items, in this order, and its indexes agree with them"""
+        self.assertEqual([id(item) for item in expected], [id(item) for item in pool])
+        self.assertEqual(len(expected), len(pool))
+        for name in NAMES:
+            self.assertEqual([id(item) for item in expected if item.name == name], [id(item) for item in pool.with_name(name)])
+            self.assertEqual(sum(1 for item in expected if item.name == name), pool.count_name(name))
+
+    def test_works_like_a_list(self):
+        """The same random edits made to a list and to a pool leave them with the same items in the same order"""
+        rng = random.Random(3)
+        expected = self.make_items(*(rng.choice(NAMES) for _ in range(30)))
+        pool = ItemPool(expected)
+        for _ in range(300):
+            operation = rng.randrange(8)
+            if operation == 0:
+                item = self.make_items(rng.choice(NAMES))[0]
+                expected.append(item)
+                pool.append(item)
+            elif operation == 1:
+                index = rng.randrange(len(expected) + 2)
+                item = self.make_items(rng.choice(NAMES))[0]
+                expected.insert(index, item)
+                pool.insert(index, item)
+            elif operation == 2 and expected:
+                item = rng.choice(expected)
+                expected.remove(item)
+                pool.remove(item)
+            elif operation == 3 and expected:
+                index = rng.randrange(-len(expected), len(expected))
+                self.assertIs(expected.pop(index), pool.pop(index))
+            elif operation == 4 and expected:
+                index = rng.randrange(-len(expected), len(expected))
+                del expected[index]
+                del pool[index]
+            elif operation == 5 and expected:
+                index = rng.randrange(-len(expected), len(expected))
+                item = self.make_items(rng.choice(NAMES))[0]
+                expected[index] = item
+                pool[index] = item
+            elif operation == 6:
+                name = rng.choice(NAMES)
+                count = min(rng.randrange(3), sum(1 for item in expected if item.name == name))
+                removed = [item for item in expected if item.name == name][:count]
+                for item in removed:
+                    expected.remove(item)
+                self.assertEqual([id(item) for item in removed], [id(item) for item in pool.remove_n(name, count)])
+            elif operation == 7 and expected:
+                index = rng.randrange(len(expected))
+                self.assertIs(expected[index], pool[index])
+            self.assertPool(expected, pool)
+
+    def test_remove_n(self):
+        items = self.make_items("Lost Wish", "Bigger Bag", "Lost Wish", "Lost Wish", "Bigger Bag")
+        pool = ItemPool(items)
+
+        self.assertEqual([id(items[0]), id(items[2])], [id(item) for item in pool.remove_n("Lost Wish", 2)])
+        self.assertPool([items[1], items[3], items[4]], pool)
+
+        with self.assertRaises(ValueError):
+            pool.remove_n("Bigger Bag", 3)
+        self.assertPool([items[1], items[3], items[4]], pool)
+        self.assertEqual([], pool.remove_n("Chapter Complete", 0))
+
+    def test_precollect_n(self):
+        items = self.make_items("Bigger Bag", "Lost Wish", "Bigger Bag")
+        pool = ItemPool(items)
+        precollected = len(self.multiworld.precollected_items[self.player])
+
+        self.assertEqual([id(items[0])], [id(item) for item in pool.precollect_n("Bigger Bag", 1, self.multiworld)])
+        self.assertPool(items[1:], pool)
+        self.assertIs(items[0], self.multiworld.precollected_items[self.player][-1])
+        self.assertEqual(precollected + 1, len(self.multiworld.precollected_items[self.player]))
+
+    def test_shuffle(self):
+        """Shuffling the pool gives the same order as shuffling the list with the same random"""
+        items = self.make_items(*NAMES * 5)
+        pool = ItemPool(items)
+        pool.remove(items[3])
+        expected = [item for item in items if item is not items[3]]
+
+        random.Random(5).shuffle(expected)
+        pool.shuffle(random.Random(5))
+        self.assertPool(expected, pool)
+
+    def test_with_classification(self):
+        fillers = self.make_items("Lost Wish", "Lost Wish", "Bigger Bag")
+        useful = self.make_items("Chapter Complete", classification=ItemClassification.useful)
+        pool = ItemPool([fillers[0], useful[0], fillers[1], fillers[2]])
+
+        self.assertEqual([id(item) for item in fillers], [id(item) for item in pool.with_classification(ItemClassification.filler)])
+
+        # a hook can change an item's classification once it's in the pool
+        fillers[1].classification = ItemClassification.useful
+        self.assertEqual([id(fillers[0]), id(fillers[2])], [id(item) for item in pool.with_classification(ItemClassification.filler)])
+        self.assertEqual([id(useful[0]), id(fillers[1])], [id(item) for item in pool.with_classification(ItemClassification.useful)])
+
+        pool.remove_n("Lost Wish", 2)
+        self.assertEqual([id(fillers[2])], [id(item) for item in pool.with_classification(ItemClassification.filler)])
+        self.assertEqual([id(useful[0])], [id(item) for item in pool.with_classification(ItemClassification.useful)])
+        self.assertEqual([], pool.with_classification(ItemClassification.trap))
+
+
+def item_values(items: list) -> list[tuple]:
+    return [(item.name, item.classification, item.code, item.player) for item in items]
+
+
+class CreateItemsBulkTest(WorldTestBase):
+    game = game_name
+
+    def test_same_as_create_item(self):
+        for name in self.world.item_name_to_item:
+            for classification in (None, ItemClassification.useful):
+                with self.subTest(name=name, classification=classification):
+                    items = self.world.create_items_bulk(name, 3, classification)
+                    self.assertEqual(item_values([self.world.create_item(name, classification) for _ in range(3)]), item_values(items))
+                    self.assertEqual(3, len({id(item) for item in items}))
+
+        self.assertEqual([], self.world.create_items_bulk("Lost Wish", 0))
+        self.assertEqual([], self.world.create_items_bulk("Lost Wish", -1))
+
+    def test_item_hooks(self):
+        """The item hooks are called for every copy once they do something"""
+        names = iter(["Lost Wish", "Bigger Bag", "Lost Wish"])
+        def before_create_item(item_name, world, multiworld, player):
+            return next(names)
+        def after_create_item(item, world, multiworld, player):
+            item.classification = ItemClassification.trap
+            return item
+
+        module = ManualWorld.__module__
+        with patch(f"{module}.run_before_create_item", True), patch(f"{module}.before_create_item", before_create_item), \
+                patch(f"{module}.run_after_create_item", True), patch(f"{module}.after_create_item", after_create_item):
+            items = self.world.create_items_bulk("Chapter Complete", 3)
+        self.assertEqual(["Lost Wish", "Bigger Bag", "Lost Wish"], [item.name for item in items])
+        self.assertEqual([ItemClassification.trap] * 3, [item.classification for item in items])
+
+        with patch(f"{module}.run_after_create_item", True), patch(f"{module}.after_create_item", after_create_item):
+            items = self.world.create_items_bulk("Chapter Complete", 2)
+        self.assertEqual([("Chapter Complete", ItemClassification.trap)] * 2, [(item.name, item.classification) for item in items])
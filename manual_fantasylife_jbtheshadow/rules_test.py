@@ -0,0 +1,534 @@
+import gc
+import json
+import os
+import random
+import tempfile
+import unittest
+import weakref
+from argparse import Namespace
+from unittest.mock import patch
+
+from BaseClasses import CollectionState, MultiWorld
+from worlds import AutoWorld
+from worlds.AutoWorld import call_all
+from test.general import gen_steps
+from test.TestBase import WorldTestBase
+
+from . import ManualWorld, Rules as manual_rules
+from .DataValidation import DataValidation, ValidationError
+from .Game import game_name
+from .Helpers import format_state_prog_items_key, ProgItemsCat, rule_dependencies
+from .hooks import Rules as hooks_rules
+from .Locations import location_name_to_location
+from .Rules import convert_data_requires_to_structured, convert_requires_to_structured, find_macro, macros, \
+    LazyRequiresEvaluator, RuleContext, RequiresToken, TokenType, tokenize_requires
+from .RulesBatch import LocationBatchEvaluator, MAXIMUM_CLAUSES, lower_to_clauses, numpy_loaded
+from .RulesCompiler import collect_bound_nodes, format_node, ItemNode, AndNode, OrNode, NotNode, TRUE, FunctionNode, MemoNode, RuleCache, RequiresCompiler
+from .RulesProfiler import RulesProfiler
+from .RulesPruning import find_region_facts, prune_implied_requires
+
+# The option sets of the slots generated together below, covering the options that change what the requires resolve to
+OPTION_SETS = [
+    {},
+    {"licenses": 1, "progressive_licenses": 1, "fast_licenses": 0, "dlc": 1, "enable_item_restrictions": 1, "bliss_bonuses": 1, "other_requests": 3},
+    {"licenses": 1, "progressive_licenses": 1, "fast_licenses": 1, "goal": 1, "enable_item_restrictions": 1},
+    {"licenses": 1, "progressive_licenses": 0, "dlc": 1, "bliss_bonuses": 1, "goal": 1, "require_main_story_for_goal": 1},
+]
+
+# The ways set_rules can make the access rules, which should all give the same results
+RULES_SETTINGS = {
+    "compiled": {},
+    "interpreted": {"rules_compile_requires": False},
+    "not pruned": {"rules_prune_implied_requires": False},
+    "cached": {"rules_cache_max_kilobytes": 64},
+    "small cache": {"rules_cache_max_kilobytes": 1},
+    "profiled": {"rules_profile": True},
+    "interpreted and profiled": {"rules_compile_requires": False, "rules_profile": True},
+}
+
+SEED = 1
+
+
+def build_multiworld(game: str, slot_options: list[dict], settings: dict, seed: int = SEED) -> MultiWorld:
+    """Generate a multiworld with a slot of the game for each options dict, like WorldTestBase.world_setup does for one slot.\n
+    The ManualWorld settings (eg. rules_compile_requires) are set on every slot before the first step."""
+    multiworld = MultiWorld(len(slot_options))
+    for player in multiworld.player_ids:
+        multiworld.game[player] = game
+    multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+    multiworld.set_seed(seed)
+    args = Namespace()
+    for name, option in AutoWorld.AutoWorldRegister.world_types[game].options_dataclass.type_hints.items():
+        setattr(args, name, {player: option.from_any(options.get(name, option.default))
+                             for player, options in zip(multiworld.player_ids, slot_options)})
+    multiworld.set_options(args)
+    for world in multiworld.worlds.values():
+        for setting, value in settings.items():
+            setattr(world, setting, value)
+    for step in gen_steps:
+        call_all(multiworld, step)
+    return multiworld
+
+def slot_option_sets() -> list[list[dict]]:
+    """Two slots with different options per multiworld, so the compiled requires shared between them get bound for both"""
+    return [[options, OPTION_SETS[(i + 1) % len(OPTION_SETS)]] for i, options in enumerate(OPTION_SETS)]
+
+def pick_items(multiworld: MultiWorld, rng: random.Random, states: int = 6) -> list[list]:
+    """For each state to check, the progression items collected in it, from none of them to all of them."""
+    items = [item for item in multiworld.itempool if item.advancement]
+    return [[item for item in items if rng.random() < i / (states - 1)] for i in range(states)]
+
+def make_state(multiworld: MultiWorld, items: list) -> CollectionState:
+    state = CollectionState(multiworld)
+    for item in items:
+        state.collect(item, True)
+    return state
+
+def compile_requires(world, requires: str):
+    return RequiresCompiler(world).compile(RuleContext(world.player, "Test", "location", requires))
+
+def state_with(multiworld: MultiWorld, player: int, *item_names: str) -> CollectionState:
+    return make_state(multiworld, [multiworld.worlds[player].create_item(item_name) for item_name in item_names])
+
+def access_results(multiworld: MultiWorld, state: CollectionState) -> dict:
+    """Whether each location can be reached, each entrance can be taken, and each slot's goal is done."""
+    results = {}
+    for location in multiworld.get_locations():
+        results[("location", location.player, location.name)] = bool(location.can_reach(state))
+    for entrance in multiworld.get_entrances():
+        results[("entrance", entrance.player, entrance.name)] = bool(entrance.access_rule(state))
+    for player in multiworld.player_ids:
+        results[("goal", player)] = bool(multiworld.completion_condition[player](state))
+    return results
+
+
+# A location of Chapter 2 given checks that every path into Chapter 2 already made (Intermission Complete:2 and Chapter Complete:1), and one that none did
+PRUNED_LOCATION = "1. Chapter 2 Start"
+PRUNED_REQUIRES = "|Intermission Complete:1| and |Chapter Complete:1| and |Bigger Bag|"
+
+
+class PruningTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def setUp(self):
+        super().setUp()
+        requires_patch = patch.dict(location_name_to_location[PRUNED_LOCATION], {"requires": PRUNED_REQUIRES})
+        requires_patch.start()
+        self.addCleanup(requires_patch.stop)
+
+    def test_implied_checks_are_pruned(self):
+        multiworld = build_multiworld(self.game, [self.options], RULES_SETTINGS["compiled"])
+        self.assertEqual(["|Intermission Complete|", "|Chapter Complete|"], multiworld.worlds[1].pruned_requires[PRUNED_LOCATION])
+        self.assertEqual("|Bigger Bag|", format_node(multiworld.get_location(PRUNED_LOCATION, 1).access_rule.root))
+
+    def test_pruned_rules_reach_the_same(self):
+        """Removing the checks already made by every entrance into a location's region doesn't change what can be reached"""
+        for slot_options in slot_option_sets():
+            with self.subTest(slot_options=slot_options):
+                pruned = build_multiworld(self.game, slot_options, RULES_SETTINGS["compiled"])
+                not_pruned = build_multiworld(self.game, slot_options, RULES_SETTINGS["not pruned"])
+                for items in pick_items(pruned, random.Random(SEED)):
+                    self.assertEqual(access_results(not_pruned, make_state(not_pruned, items)),
+                                     access_results(pruned, make_state(pruned, items)))
+
+    def test_region_facts_hold(self):
+        """The item and category counts known to be true in a region are there in every state that can reach it"""
+        multiworld = build_multiworld(self.game, [self.options], RULES_SETTINGS["not pruned"])
+        region_facts = find_region_facts(multiworld.worlds[1])
+        self.assertEqual(2, region_facts[multiworld.get_region("Chapter 2", 1)][("item", "Intermission Complete")])
+        for items in pick_items(multiworld, random.Random(SEED)):
+            state = make_state(multiworld, items)
+            for region, facts in region_facts.items():
+                if not region.can_reach(state):
+                    continue
+                for key, count in facts.items():
+                    if key[0] == "item":
+                        self.assertGreaterEqual(state.count(key[1], 1), count, (region.name, key))
+                    elif key[0] == "category":
+                        self.assertGreaterEqual(state.count(format_state_prog_items_key(ProgItemsCat.CATEGORY, key[1]), 1), count, (region.name, key))
+
+    def test_changed_rules_are_left_alone(self):
+        """An access rule replaced after set_rules isn't pruned"""
+        multiworld = build_multiworld(self.game, [self.options], RULES_SETTINGS["not pruned"])
+        location = multiworld.get_location(PRUNED_LOCATION, 1)
+        location.access_rule = rule = lambda state: True
+        self.assertNotIn(PRUNED_LOCATION, prune_implied_requires(multiworld.worlds[1]))
+        self.assertIs(rule, location.access_rule)
+
+
+@unittest.skipUnless(numpy_loaded, "NumPy isn't installed")
+class BatchTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def test_lower_to_clauses(self):
+        node = AndNode((OrNode((ItemNode("A", 1), ItemNode("B", 1))), NotNode(ItemNode("C", 2))))
+        self.assertEqual([(("A", 1, False), ("C", 2, True)), (("B", 1, False), ("C", 2, True))], lower_to_clauses(node))
+        self.assertEqual([()], lower_to_clauses(TRUE))
+        self.assertIsNone(lower_to_clauses(AndNode((ItemNode("A", 1), FunctionNode(lambda: True, "f", "", 0)))))
+
+        # (A1 or B1) and (A2 or B2) and ... doubles the clauses each time
+        too_many = AndNode(tuple(OrNode((ItemNode(f"A{i}", 1), ItemNode(f"B{i}", 1))) for i in range(MAXIMUM_CLAUSES.bit_length())))
+        self.assertIsNone(lower_to_clauses(too_many))
+
+    def test_batch_matches_access_rules(self):
+        """The batch gives the same results as each location's own access rule, for lowered locations and fallbacks alike"""
+        for slot_options in slot_option_sets():
+            with self.subTest(slot_options=slot_options):
+                multiworld = build_multiworld(self.game, slot_options, RULES_SETTINGS["compiled"])
+                for player, world in multiworld.worlds.items():
+                    evaluator = LocationBatchEvaluator(world)
+                    self.assertTrue(len(evaluator.vector_rows))
+                    for items in pick_items(multiworld, random.Random(SEED)):
+                        state = make_state(multiworld, items)
+                        self.assertEqual([bool(location.parent_region.can_reach(state) and location.access_rule(state)) for location in evaluator.locations],
+                                         [bool(result) for result in evaluator.evaluate(state)])
+
+    def test_evaluate_all_locations(self):
+        """evaluate_all_locations gives the same results as checking each location with can_reach"""
+        for slot_options in slot_option_sets():
+            with self.subTest(slot_options=slot_options):
+                multiworld = build_multiworld(self.game, slot_options, RULES_SETTINGS["compiled"])
+                for items in pick_items(multiworld, random.Random(SEED)):
+                    state = make_state(multiworld, items)
+                    for player, world in multiworld.worlds.items():
+                        self.assertEqual([location.can_reach(state) for location in multiworld.get_locations(player)],
+                                         [bool(result) for result in world.evaluate_all_locations(state)])
+
+
+def replace_a_rule(world, multiworld, player):
+    """An after_set_rules hook replacing the access rule of a location with one reading an item its requires don't"""
+    multiworld.get_location(PRUNED_LOCATION, player).access_rule = lambda state: state.has("Bigger Bag", player)
+
+
+class DependencyIndexTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def assert_rules_to_recheck(self, multiworld: MultiWorld, rng: random.Random):
+        """Collecting an item only changes the access rules get_rules_to_recheck returns for it"""
+        for items in pick_items(multiworld, rng, 4):
+            state = make_state(multiworld, items)
+            for player, world in multiworld.worlds.items():
+                spots = [*multiworld.get_locations(player), *multiworld.get_entrances(player)]
+                before = {spot: bool(spot.access_rule(state)) for spot in spots}
+                candidates = [item for item in multiworld.itempool if item.player == player and item.advancement]
+                for item in rng.sample(candidates, min(20, len(candidates))):
+                    after = state.copy()
+                    after.collect(item, True)
+                    changed = {spot for spot in spots if bool(spot.access_rule(after)) != before[spot]}
+                    self.assertLessEqual(changed, world.get_rules_to_recheck(item), item.name)
+
+    def test_rules_to_recheck(self):
+        for slot_options in slot_option_sets():
+            with self.subTest(slot_options=slot_options):
+                self.assert_rules_to_recheck(build_multiworld(self.game, slot_options, RULES_SETTINGS["compiled"]), random.Random(SEED))
+
+    def test_rule_replaced_by_a_hook(self):
+        """A rule replaced after set_rules has unknown dependencies, so it's always rechecked"""
+        with patch(f"{ManualWorld.__module__}.after_set_rules", replace_a_rule):
+            multiworld = build_multiworld(self.game, [self.options], RULES_SETTINGS["compiled"])
+        world = multiworld.worlds[1]
+        location = multiworld.get_location(PRUNED_LOCATION, 1)
+        for item in multiworld.itempool:
+            self.assertIn(location, world.get_rules_to_recheck(item), item.name)
+        self.assertNotIn(location, world.rule_dependency_index.get_affected(["Bigger Bag"]))
+        self.assert_rules_to_recheck(multiworld, random.Random(SEED))
+
+
+class RuleCacheTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def test_cached_rules_agree(self):
+        """Cached rules give the same results as the compiled ones, also with a cache small enough to drop results all the time"""
+        for slot_options in slot_option_sets():
+            with self.subTest(slot_options=slot_options):
+                multiworlds = {name: build_multiworld(self.game, slot_options, RULES_SETTINGS[name]) for name in ("compiled", "cached", "small cache")}
+                reference = multiworlds["compiled"]
+                for items in pick_items(reference, random.Random(SEED)):
+                    expected = access_results(reference, make_state(reference, items))
+                    for name, multiworld in multiworlds.items():
+                        self.assertEqual(expected, access_results(multiworld, make_state(multiworld, items)), name)
+                self.assertTrue(any(world.rule_cache.entries for world in multiworlds["cached"].worlds.values()))
+
+    def test_cache_size(self):
+        """The cache drops the least recently used results to stay under its size"""
+        cache = RuleCache(1024)
+        keys = [(i, (i, 0, 1)) for i in range(20)]
+        for key in keys[:4]:
+            cache.put(key, True)
+        self.assertEqual(4 * cache.entry_size(keys[0]), cache.size)
+
+        self.assertTrue(cache.get(keys[0]))
+        for key in keys[4:]:
+            cache.put(key, False)
+        self.assertLessEqual(cache.size, 1024)
+        self.assertEqual(sum(cache.entry_size(key) for key in cache.entries), cache.size)
+        self.assertNotIn(keys[1], cache.entries)
+        self.assertEqual(keys[-1], next(reversed(cache.entries)))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+
+class CompiledCachesTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def test_caches_are_per_multiworld(self):
+        """The slots of a multiworld share the compiled caches, which go away with it"""
+        multiworld = build_multiworld(self.game, slot_option_sets()[0], RULES_SETTINGS["compiled"])
+        first, second = multiworld.worlds.values()
+        self.assertIs(first.compiled_requires_cache, second.compiled_requires_cache)
+        self.assertIs(first.compiled_nodes_cache, second.compiled_nodes_cache)
+        self.assertIsNot(self.world.compiled_nodes_cache, first.compiled_nodes_cache)
+
+        reference = weakref.ref(multiworld)
+        del multiworld, first, second
+        gc.collect()
+        self.assertIsNone(reference())
+
+
+def returns_a_requires():
+    return "|Bigger Bag| or |Prologue Complete|"
+
+def loops():
+    return "|Bigger Bag| and {loops()}"
+
+@rule_dependencies("Bigger Bag", "Prologue Complete")
+def per_player(player: int):
+    return "|Bigger Bag|" if player == 1 else "|Prologue Complete|"
+
+
+class CompiledRequiresTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def setUp(self):
+        super().setUp()
+        for func in (returns_a_requires, loops, per_player):
+            function_patch = patch.object(hooks_rules, func.__name__, func, create=True)
+            function_patch.start()
+            self.addCleanup(function_patch.stop)
+
+    def test_returned_requires_is_spliced(self):
+        """A requires returned by a function is read in place of the call, without parentheses around it"""
+        root = compile_requires(self.world, "|Chapter Complete:1| and {returns_a_requires()}")
+        self.assertTrue(root.evaluate(state_with(self.multiworld, 1, "Prologue Complete"), 1))
+        self.assertFalse(root.evaluate(state_with(self.multiworld, 1, "Bigger Bag"), 1))
+        self.assertTrue(root.evaluate(state_with(self.multiworld, 1, "Chapter Complete", "Bigger Bag"), 1))
+
+    def test_splices_are_per_player(self):
+        """The requires shared by two players keep the strings returned to each player and their last values in that player's world"""
+        multiworld = build_multiworld(self.game, [OPTION_SETS[0], OPTION_SETS[1]], RULES_SETTINGS["compiled"])
+        roots = [compile_requires(world, "|Chapter Complete:1| or {per_player()}") for world in multiworld.worlds.values()]
+        self.assertIs(roots[0], roots[1])
+        root = roots[0]
+
+        state = make_state(multiworld, [multiworld.worlds[player].create_item("Bigger Bag") for player in (1, 2)])
+        self.assertTrue(root.evaluate(state, 1))
+        self.assertFalse(root.evaluate(state, 2))
+
+        memo = next(node for node in collect_bound_nodes(root, []) if isinstance(node, MemoNode))
+        for player, result, value in ((1, "|Bigger Bag|", True), (2, "|Prologue Complete|", False)):
+            world = multiworld.worlds[player]
+            self.assertEqual([result], [returned for _, returned in world.rule_splices])
+            self.assertEqual(value, world.rule_memo[memo][1])
+
+    def test_recursion_limit(self):
+        root = compile_requires(self.world, "{loops()}")
+        with self.assertRaises(RecursionError):
+            root.evaluate(state_with(self.multiworld, 1, "Bigger Bag"), 1)
+
+
+class InterpreterTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def evaluate(self, requires: str, values: dict) -> tuple[bool, list[str]]:
+        """Evaluate a requires with the operands given by their text, and which operands were looked at"""
+        evaluated = []
+        def evaluate_operand(token: RequiresToken) -> bool:
+            evaluated.append(token.text)
+            return bool(values[token.text])
+        context = RuleContext(1, "Test", "location", requires)
+        return LazyRequiresEvaluator(tokenize_requires(requires), context, evaluate_operand).evaluate(), evaluated
+
+    def test_tokenize_requires(self):
+        tokens = tokenize_requires("(|Chapter Complete:12| AND {YamlEnabled(dlc, x)}) or !|@Licenses:2| or 10")
+        self.assertEqual([TokenType.OPEN, TokenType.ITEM, TokenType.AND, TokenType.FUNCTION, TokenType.CLOSE,
+                          TokenType.OR, TokenType.NOT, TokenType.CATEGORY, TokenType.OR, TokenType.NUMBER],
+                         [token.type for token in tokens])
+        self.assertEqual(("Chapter Complete", "12"), (tokens[1].name, tokens[1].value))
+        self.assertEqual(("YamlEnabled", "dlc, x"), (tokens[3].name, tokens[3].value))
+        self.assertEqual(("Licenses", "2"), (tokens[7].name, tokens[7].value))
+        self.assertEqual("10", tokens[9].text)
+
+    def test_lazy_evaluation(self):
+        """The right side of an AND/OR is only evaluated when the left side doesn't decide the result"""
+        self.assertEqual((False, ["|A|"]), self.evaluate("|A| and (|B| or |C|)", {"|A|": False}))
+        self.assertEqual((True, ["|A|"]), self.evaluate("|A| or (!|B| and |C|)", {"|A|": True}))
+        self.assertEqual((True, ["|A|", "|B|", "|C|"]), self.evaluate("|A| and |B| or |C|", {"|A|": True, "|B|": False, "|C|": True}))
+        self.assertEqual((True, ["|A|", "12"]), self.evaluate("|A| or 12", {"|A|": False, "12": 12}))
+        self.assertEqual((True, []), self.evaluate("", {}))
+
+    def test_logic_errors(self):
+        for requires in ("|A| and", "|A| |B|", "|A|)", "and |A|"):
+            with self.subTest(requires=requires), self.assertRaises(KeyError):
+                self.evaluate(requires, {"|A|": True, "|B|": True})
+
+    def test_requires_are_tokenized_when_registered(self):
+        """Checking the interpreted access rules doesn't tokenize anything, the requires of the data were tokenized by set_rules"""
+        multiworld = build_multiworld(self.game, slot_option_sets()[1], RULES_SETTINGS["interpreted"])
+        with patch.object(manual_rules, "tokenize_requires", wraps=tokenize_requires) as tokenize, \
+                patch.object(manual_rules, "compile_requires_list", wraps=manual_rules.compile_requires_list) as compile_list:
+            for items in pick_items(multiworld, random.Random(SEED)):
+                access_results(multiworld, make_state(multiworld, items))
+        tokenize.assert_not_called()
+        compile_list.assert_not_called()
+
+    def test_interpreted_rules_agree(self):
+        """The interpreted requires give the same results as the compiled ones"""
+        for slot_options in slot_option_sets():
+            with self.subTest(slot_options=slot_options):
+                compiled = build_multiworld(self.game, slot_options, RULES_SETTINGS["compiled"])
+                interpreted = build_multiworld(self.game, slot_options, RULES_SETTINGS["interpreted"])
+                for items in pick_items(compiled, random.Random(SEED)):
+                    self.assertEqual(access_results(compiled, make_state(compiled, items)),
+                                     access_results(interpreted, make_state(interpreted, items)))
+
+
+class StructuredRequiresTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def test_convert_requires_to_structured(self):
+        self.assertEqual({"and": [{"item": "Prologue Complete"}, {"call": "has_license", "args": ["Adept Miner"]}]},
+                         convert_requires_to_structured("|Prologue Complete| and {has_license(Adept Miner)}"))
+        # AND and OR are read left to right, so the OR here is inside the AND
+        self.assertEqual({"and": [{"or": [{"item": "Bigger Bag", "count": 2}, {"category": "Licenses", "count": "all"}]},
+                                  {"not": {"macro": "Story"}}, False]},
+                         convert_requires_to_structured("|Bigger Bag:2| or |@Licenses:all| and ![Story] and 0"))
+        self.assertTrue(convert_requires_to_structured(""))
+        with self.assertRaises(KeyError):
+            convert_requires_to_structured("|Bigger Bag| and", {"name": "Test"})
+
+    def test_convert_data_requires_to_structured(self):
+        locations = [{"name": "A", "requires": "|Bigger Bag|"}, {"name": "B", "requires": ["Bigger Bag"]}, {"name": "C"}]
+        regions = {"Town": {"requires": "!|Bigger Bag|", "entrance_requires": {"Menu": "|Prologue Complete|", "Field": True}}}
+
+        self.assertEqual([{"name": "A", "requires": {"item": "Bigger Bag"}}, locations[1], locations[2]],
+                         convert_data_requires_to_structured(locations))
+        self.assertEqual({"Town": {"requires": {"not": {"item": "Bigger Bag"}},
+                                   "entrance_requires": {"Menu": {"item": "Prologue Complete"}, "Field": True}}},
+                         convert_data_requires_to_structured(regions))
+        self.assertEqual("|Bigger Bag|", locations[0]["requires"])
+        self.assertEqual("|Prologue Complete|", regions["Town"]["entrance_requires"]["Menu"])
+
+    def test_structured_rules_agree(self):
+        """A structured requires gives the same results as the requires string it was converted from"""
+        requires = "|Chapter Complete:1| and (|Bigger Bag| or !|Prologue Complete|)"
+        string_root = compile_requires(self.world, requires)
+        structured_root = compile_requires(self.world, convert_requires_to_structured(requires))
+        for items in ((), ("Chapter Complete",), ("Chapter Complete", "Prologue Complete"), ("Chapter Complete", "Prologue Complete", "Bigger Bag")):
+            state = state_with(self.multiworld, 1, *items)
+            self.assertEqual(string_root.evaluate(state, 1), structured_root.evaluate(state, 1), items)
+
+    def test_empty_object_is_true(self):
+        self.assertIs(TRUE, compile_requires(self.world, {}))
+        self.assertIs(TRUE, compile_requires(self.world, {"and": [{}, True]}))
+        DataValidation._checkItemNamesInStructuredRequires({}, "location Test")
+
+    def test_macros(self):
+        with patch.dict(macros, {"Story": "|Prologue Complete| and |Chapter Complete:1|", "Broken": 1}):
+            context = RuleContext(1, "Test", "location")
+            self.assertEqual("|Prologue Complete| and |Chapter Complete:1|", find_macro("Story", context))
+            for macro_name in ("Broken", "Missing"):
+                with self.subTest(macro_name=macro_name), self.assertRaises(ValueError):
+                    find_macro(macro_name, context)
+
+            for requires in ("[Story] or |Intermission Complete|", {"or": [{"macro": "Story"}, {"item": "Intermission Complete"}]}):
+                root = compile_requires(self.world, requires)
+                self.assertFalse(root.evaluate(state_with(self.multiworld, 1, "Prologue Complete"), 1))
+                self.assertTrue(root.evaluate(state_with(self.multiworld, 1, "Prologue Complete", "Chapter Complete"), 1))
+
+    def test_check_macros_in_requires(self):
+        tables = {
+            "item_table": [{"name": "Bigger Bag", "category": ["Bags"]}],
+            "region_table": {"Town": {"requires": "[Bags]", "entrance_requires": {"Menu": {"macro": "Bags"}}}},
+        }
+        valid_macros = {"Bags": "|@Bags:1| or |Bigger Bag|"}
+        # item names and function arguments can contain square brackets
+        valid_locations = [{"name": "A", "requires": "|Bigger Bag| and {YamlEnabled([x])}"}, {"name": "B", "requires": {}}]
+        with patch.multiple(DataValidation, game_table={"macros": valid_macros}, location_table=valid_locations, **tables):
+            DataValidation.checkMacrosInRequires()
+
+        invalid = {
+            "undefined macro": ({"macros": valid_macros}, [{"name": "A", "requires": "[Missing] or |Bigger Bag|"}]),
+            "undefined structured macro": ({"macros": valid_macros}, [{"name": "A", "requires": {"not": {"macro": "Missing"}}}]),
+            "macro is not a string": ({"macros": {"Bags": True}}, []),
+            "misspelled item in macro": ({"macros": {"Bags": "|Biger Bag|"}}, []),
+            "misspelled category in macro": ({"macros": {"Bags": "|@Bag|"}}, []),
+        }
+        for case, (game_table, location_table) in invalid.items():
+            with self.subTest(case), patch.multiple(DataValidation, game_table=game_table, location_table=location_table, **tables):
+                with self.assertRaises(ValidationError):
+                    DataValidation.checkMacrosInRequires()
+
+
+class ProfilerTest(WorldTestBase):
+    game = game_name
+    options = OPTION_SETS[1]
+
+    def test_profiled_rules_agree(self):
+        """Profiling the access rules doesn't change their results, and times them and the functions they call"""
+        slot_options = slot_option_sets()[1]
+        reference = build_multiworld(self.game, slot_options, RULES_SETTINGS["compiled"])
+        for name in ("profiled", "interpreted and profiled"):
+            with self.subTest(name):
+                multiworld = build_multiworld(self.game, slot_options, RULES_SETTINGS[name])
+                for items in pick_items(reference, random.Random(SEED)):
+                    self.assertEqual(access_results(reference, make_state(reference, items)),
+                                     access_results(multiworld, make_state(multiworld, items)))
+
+                stats = multiworld.worlds[1].rules_profiler.stats
+                has_license = stats[("function", "has_license")]
+                self.assertGreater(has_license.count, 0)
+                self.assertGreater(has_license.time, 0)
+                self.assertTrue(any(rule.count for (kind, _), rule in stats.items() if kind == "location"))
+                self.assertGreater(sum(rule.functions_time for (kind, _), rule in stats.items() if kind != "function"), 0)
+
+    def test_wrapped_rules(self):
+        profiler = RulesProfiler()
+        function = profiler.wrap("function", "is_even", lambda state: state % 2 == 0)
+        location = profiler.wrap("location", "A", lambda state: function(state) and function(state + 2))
+
+        self.assertEqual([True, False, True], [location(state) for state in (0, 1, 2)])
+        stats = profiler.get_stats("location", "A")
+        self.assertEqual((3, 2), (stats.count, stats.true_count))
+        self.assertEqual((5, 4), (profiler.get_stats("function", "is_even").count, profiler.get_stats("function", "is_even").true_count))
+        self.assertGreater(stats.functions_time, 0)
+        self.assertLessEqual(stats.functions_time, stats.time)
+        # a function called outside of an access rule isn't added to any
+        function(4)
+        self.assertIsNone(profiler.checking)
+
+    def test_report(self):
+        profiler = RulesProfiler()
+        profiler.record("location", "Slow", 0.002, True)
+        profiler.record("location", "Slow", 0.002, False)
+        profiler.record("function", "fast", 0.001, "|Bigger Bag|")
+
+        with tempfile.TemporaryDirectory() as directory:
+            profiler.write_report(directory, "AP_1", "Test report")
+            with open(os.path.join(directory, "AP_1_rules_profile.txt"), encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            with open(os.path.join(directory, "AP_1_rules_profile.json"), encoding="utf-8") as f:
+                report = json.load(f)
+
+        self.assertEqual("Test report", lines[0])
+        self.assertTrue(lines[2].startswith("Kind"))
+        self.assertEqual(["location", "2", "4.00", "2000.0", "50.0", "0.00", "Slow"], lines[3].split())
+        self.assertEqual(["Slow", "fast"], [stats["name"] for stats in report])
+        self.assertEqual({"kind": "function", "name": "fast", "count": 1, "time": 0.001, "true_ratio": 0.0, "functions_time": 0.0}, report[1])